@@ -3,116 +3,16 @@ import numpy as np
 import nibabel as nib
 import networkx as nx
 import matplotlib.pyplot as plt
+from roi_extract import load_roits_multi
+from graph_store import save_graph
 
 ###### Parameters
 targetDeg = 10  # target average degree
 
 
 ###### Network construction functions, based on correlation matrix
-
-def net_builder_RankTh(R, NodeInd, d, cType=1):
-    '''
-    a function to construct the network by the rank-based thresholding
-     
-    input parameters:
-          R:         A dense correlation matrix array.
-          NodeInd:   A list of nodes in the network.
-          d:         The rank threshold for the rank-based thresholding.
-          cType:     Type of functional connectivity. 
-                        1:  Positive correlation only
-                        0:  Both positive and negative correlations
-                        -1: Negative correlation only
-                     The default is 1 (i.e., positive correlation only).
-    returns:
-          G:         The resulting graph (networkX format)
-    '''
-
-    # first, initialize the graph
-    G = nx.Graph()
-    G.add_nodes_from(NodeInd)
-    NNodes = R.shape[0]
-    # the working copy of R, depending on the connectivity type
-    if cType==1:
-        WorkR = np.copy(R)
-    elif cType==0:
-        WorkR = abs(np.copy(R))
-    elif cType==-1:
-        WorkR = np.copy(-R)
-    # then add edges
-    for iRank in range(d):
-        I = np.arange(NNodes)
-        J = np.argmax(WorkR, axis=1)
-        # R has to be non-zero
-        trI = [i for i in range(NNodes) if WorkR[i, J[i]]>0]
-        trJ = [J[i] for i in range(NNodes) if WorkR[i, J[i]]>0]
-        # adding connections (for R>0)
-        Elist = np.vstack((NodeInd[trI], NodeInd[trJ])).T 
-        G.add_edges_from(Elist)
-        WorkR[trI, trJ] = 0  # clearing the correlation matrix
-    # finally returning the resultant graph
-    return G
-
-
-
-def net_builder_HardTh(R, NodeInd, K, cType=1):
-    '''
-    a function to construct the network by the hard-thresholding.
-    input parameters:
-          R:         A dense correlation matrix array.
-          NodeInd:   A list of nodes in the network.
-          K:         The target K, the average connections at each node
-          cType:     Type of functional connectivity. 
-                        1:  Positive correlation only
-                        0:  Both positive and negative correlations
-                        -1: Negative correlation only
-                     The default is 1 (i.e., positive correlation only).
-    
-    returns:
-          G:         The resulting graph (networkX format)
-    '''
-    
-    # first, initialize the graph
-    G = nx.Graph()
-    G.add_nodes_from(NodeInd)
-    NNodes = R.shape[0]
-    # upper triangle of the correlation matrix only
-    I,J = np.triu_indices(NNodes,1)
-    # creating a vector of correlation coefficients, depending on cType
-    if cType==1:
-        VecR = np.squeeze(np.array(R[I,J]))
-    elif cType==0:
-        VecR = np.squeeze(np.array(abs(R[I,J])))
-    elif cType==-1:
-        VecR = np.squeeze(np.array(-R[I,J]))
-    # the number of elements is too big, so we truncate it
-    # first, find the appropriate threshold for R
-    NthR = 0
-    tmpRth = 0.95
-    StepTh = 0.05
-    while NthR<K*NNodes/2.0:
-        tmpRth -= StepTh
-        #print('Threshold = %.2f' % tmpRth)
-        NthR = len(np.nonzero(VecR>tmpRth)[0])
-    # second, truncate the variables
-    IndVecR = np.nonzero(VecR>tmpRth)
-    thVecR = VecR[IndVecR]
-    thI = I[IndVecR]
-    thJ = J[IndVecR]
-    # sort the correlation values
-    zipR = zip(thVecR, thI, thJ)
-    zipsR = sorted(zipR, key = lambda t: t[0], reverse=True)
-    sVecR, sI, sJ = zip(*zipsR)
-    # then adding edges
-    m = int(np.ceil(K*NNodes/2.0))  # the number of edges
-    trI = np.array(sI[:m])
-    trJ = np.array(sJ[:m])
-    Elist = np.vstack((NodeInd[trI], NodeInd[trJ])).T
-    G.add_edges_from(Elist)
-    RTh = sVecR[m-1]  # the threshold
-    # finally returning the resultant graph and the threshold
-    return G
-
-
+from net_builder import net_builder_HardTh, net_builder_RankTh
+from net_builder import csr_graph_view
 
 
 
@@ -210,11 +110,8 @@ xyz_degree = []
 for i,targetK in enumerate(subK):
 
     ###### Loadin the data from the previous time
-    f_TS = 'DataAtlas/Oxford_sub16112_Rt2_K' + str(targetK) + '.npz'
-    infile = np.load(f_TS)
-    ts = infile['ts']
-    nodes = infile['nodes']
-    xyz = infile['xyz']
+    f_TS = 'DataAtlas/Oxford_sub16112_rt2_allK.npz'
+    ts, nodes, xyz = load_roits_multi(f_TS, targetK)
 
 
     ###### Calculating the correlation matrix
@@ -227,7 +124,9 @@ for i,targetK in enumerate(subK):
 
     ###### Thresholding
     # hard thresholding -- with user-defined target degree
-    G = net_builder_HardTh(R, nodes, targetDeg)
+    A, nodes, RTh = net_builder_HardTh(R, nodes, targetDeg, returnTh=True,
+                                       output='csr')
+    G = csr_graph_view(A, nodes)  # (read-only, for writing and drawing)
     # keeping the results for later
     G_degree.append(G)
     nodes_degree.append(nodes)
@@ -235,8 +134,12 @@ for i,targetK in enumerate(subK):
 
     ###### writing network to a file
     fNet = 'DataAtlas/Oxford_sub16112_Rt2_K' + str(targetK)
-    fNet += '_deg' + str(targetDeg) + '.adjlist'
-    nx.write_adjlist(G, fNet)
+    fNet += '_deg' + str(targetDeg)
+    nx.write_adjlist(G, fNet + '.adjlist')
+    # binary graph format, with the correlations as weights
+    save_graph(fNet + '.graph', A, nodes, weights=R, xyz=xyz,
+               meta={'K': targetK, 'targetDeg': targetDeg, 'RTh': RTh,
+                     'cType': 1, 'source': f_TS})
 
 
 
@@ -1,66 +1,59 @@
 import os
-import numpy as np
-import networkx as nx
+import pandas as pd
 import matplotlib.pyplot as plt
+from small_world import small_world_batch
 
 
 ###### Parameters
 targetDeg = 10  # target average degree
+listSubj = ['Oxford_sub16112']  # subjects
+fSW = 'DataAtlas/SmallWorld_Rt2_deg' + str(targetDeg) + '.csv'
 
 
 
 ###### Loading network data and calculate small-worldness stats
 # Ks for clustering algorithm
-K = list(range(10,301,10)) + list(range(350,1000,50))  
-subK = [50, 100, 200, 500, 950]   # Ks for example atlases
-indK = [list(K).index(k) for k in subK]  # indices corresponding to subK
-
-G_list = []
-N_list = []
-C_list = []
-L_list = []
-for i,targetK in enumerate(subK):
-    ###### file name, then loading
-    fNet = 'DataAtlas/Oxford_sub16112_Rt2_K' + str(targetK)
-    fNet += '_deg' + str(targetDeg) + '.adjlist'
-    G = nx.read_adjlist(fNet, nodetype=int)
-    G_list.append(G)
-
-    ###### number of nodes
-    N_list.append(len(G.nodes()))
-
-    ##### clistering coefficient
-    C_list.append(nx.average_clustering(G))
-
-    ##### path length, giant component only
-    GC_nodes = max(nx.connected_components(G), key=len)  
-    GC = G.subgraph(GC_nodes)  
-    L_list.append(nx.average_shortest_path_length(GC))
-
-
-###### Plotting C and L
-plt.figure(figsize=[9,4])
-
-plt.subplot(131)
-plt.plot(subK,N_list,'b.-')
-plt.xscale('log')
-plt.xlabel('Atlas K')
-plt.ylabel('Number of nodes')
-plt.title('Number of nodes vs K')
-
-plt.subplot(132)
-plt.plot(subK,C_list,'b.-')
-plt.xscale('log')
-plt.xlabel('Atlas K')
-plt.ylabel('Clustering coefficient')
-plt.title('Clusetering coefficient vs K')
-
-plt.subplot(133)
-plt.plot(subK,L_list,'b.-')
-plt.xscale('log')
-plt.xlabel('Atlas K')
-plt.ylabel('Path length')
-plt.title('Path length vs K')
-
-plt.subplots_adjust(wspace=0.4)
-plt.show()
+K = list(range(10,301,10)) + list(range(350,1000,50))
+
+# network files of all the subjects and Ks (the ones available)
+listNet = []
+listInfo = []
+for subj in listSubj:
+    for targetK in K:
+        fNet = 'DataAtlas/' + subj + '_Rt2_K' + str(targetK)
+        fNet += '_deg' + str(targetDeg) + '.adjlist'
+        if os.path.isfile(fNet):
+            listNet.append(fNet)
+            listInfo.append({'subject': subj, 'K': targetK})
+
+# C, L, sigma and omega, against random and lattice references
+# (networks in parallel, reference networks cached in NullCache)
+if __name__ == '__main__':
+    dfSW = small_world_batch(listNet, listInfo, nRef=10, nProc=4)
+    dfSW.to_csv(fSW, index=False)
+
+    ##### loading from the file to save time
+    dfSW = pd.read_csv(fSW)
+    print(dfSW[['subject', 'K', 'nNodes', 'C', 'L', 'sigma', 'omega']])
+
+
+    ###### Plotting N, C, L, sigma and omega
+    listPlot = [('nNodes', 'Number of nodes'),
+                ('C', 'Clustering coefficient'),
+                ('L', 'Path length'),
+                ('sigma', 'Small-world sigma'),
+                ('omega', 'Small-world omega')]
+
+    plt.figure(figsize=[15,4])
+
+    for i,(col, label) in enumerate(listPlot):
+        plt.subplot(1,len(listPlot),i+1)
+        for subj, dfSubj in dfSW.groupby('subject'):
+            plt.plot(dfSubj.K,dfSubj[col],'.-')
+        plt.xscale('log')
+        plt.xlabel('Atlas K')
+        plt.ylabel(label)
+        plt.title(label + ' vs K')
+
+    plt.subplots_adjust(wspace=0.5)
+    plt.show()
@@ -0,0 +1,119 @@
+#
+# atlas_cache.py
+#
+# caches the ROI geometry (centroids, voxel counts, bounding boxes) of an
+# atlas image. The cache file is keyed by the content hash of the atlas
+# file, so it is computed once and then loaded by every subject / script.
+# Within a process, the hash itself is remembered for as long as the atlas
+# file's path, modification time and size stay the same, so the file is not
+# read again for every subject.
+#
+
+import os
+import hashlib
+import numpy as np
+import nibabel as nib
+from roi_extract import roi_geometry, select_roi
+
+
+# content hashes already calculated in this process, by
+# (path, modification time, size)
+hashCache = {}
+
+
+##### function to calculate the content hash of a file
+def file_hash(fName, blockSize=2**20):
+    '''
+    A function to calculate the SHA-1 hash of the content of a file.
+    '''
+    h = hashlib.sha1()
+    with open(fName, 'rb') as f:
+        for block in iter(lambda: f.read(blockSize), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def atlas_hash(fAtlas):
+    '''
+    A function to get the content hash of an atlas file, calculated only if
+    the file has changed (path, modification time or size) since the last
+    call in this process.
+    '''
+    st = os.stat(fAtlas)
+    key = (os.path.abspath(fAtlas), st.st_mtime_ns, st.st_size)
+    if key not in hashCache:
+        hashCache[key] = file_hash(fAtlas)
+    return hashCache[key]
+
+
+
+##### function to load (or calculate and cache) the atlas geometry
+def atlas_geometry(fAtlas, cacheDir=None):
+    '''
+    A function to get the ROI geometry of every volume in an atlas image.
+    The results are stored in cacheDir, in a file named after the content
+    hash of the atlas file, and are loaded from there next time.
+    input parameters:
+          fAtlas:   The file name of the atlas image (3D or 4D).
+          cacheDir: The directory for the cache files. The default is None,
+                    meaning a directory AtlasCache next to the atlas file.
+    returns:
+          roiList:  A list of roi_ind vectors, one for each atlas volume.
+          xyzList:  A list of ROI centroid arrays (voxel coordinates).
+          nVoxList: A list of vectors of the number of voxels in each ROI.
+          bboxList: A list of ROI bounding box arrays.
+    '''
+
+    # the cache file, keyed by the content hash
+    if cacheDir is None:
+        cacheDir = os.path.join(os.path.dirname(fAtlas), 'AtlasCache')
+    fCache = os.path.join(cacheDir, 'atlas_' + atlas_hash(fAtlas) + '.npz')
+
+    # calculating the geometry if not cached yet
+    if not os.path.isfile(fCache):
+        X_atlas = np.asarray(nib.load(fAtlas).dataobj)
+        if X_atlas.ndim==3:
+            X_atlas = X_atlas[:,:,:,np.newaxis]
+        geomList = [roi_geometry(X_atlas[:,:,:,i])
+                    for i in range(X_atlas.shape[-1])]
+        if not os.path.isdir(cacheDir):
+            os.makedirs(cacheDir)
+        np.savez(fCache,
+                 nROI = np.array([len(x[0]) for x in geomList]),
+                 roi_ind = np.hstack([x[0] for x in geomList]),
+                 xyz = np.vstack([x[1] for x in geomList]),
+                 nVox = np.hstack([x[2] for x in geomList]),
+                 bbox = np.vstack([x[3] for x in geomList]))
+
+    # loading the geometry from the cache
+    infile = np.load(fCache)
+    offset = np.cumsum([0] + list(infile['nROI']))
+    roiList = []
+    xyzList = []
+    nVoxList = []
+    bboxList = []
+    for i in range(len(offset)-1):
+        roiList.append(infile['roi_ind'][offset[i]:offset[i+1]])
+        xyzList.append(infile['xyz'][offset[i]:offset[i+1]])
+        nVoxList.append(infile['nVox'][offset[i]:offset[i+1]])
+        bboxList.append(infile['bbox'][offset[i]:offset[i+1]])
+    return roiList, xyzList, nVoxList, bboxList
+
+
+
+##### function to get ROI centroids from the cached atlas geometry
+def atlas_coord(fAtlas, nodeList, iVol=0, cacheDir=None):
+    '''
+    A function to get the centroids of ROIs in nodeList from the cached
+    geometry of the atlas file (same as roi_coord on the atlas volume).
+    input parameters:
+          fAtlas:   The file name of the atlas image.
+          nodeList: A list of ROI numbers.
+          iVol:     The volume of a 4D atlas (e.g., the index of K for the
+                    Rt2 atlas). The default is 0.
+          cacheDir: The cache directory (see atlas_geometry).
+    returns:
+          xyzROI:   An array of ROI centroids, in the order of nodeList.
+    '''
+    roiList, xyzList, nVoxList, bboxList = atlas_geometry(fAtlas, cacheDir)
+    return select_roi(roiList[iVol], xyzList[iVol], nodeList)
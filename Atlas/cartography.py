@@ -0,0 +1,113 @@
+#
+# cartography.py
+#
+# network cartography (Guimera & Amaral, 2005) of a network with a given
+# module partition. The number of edges from each node to each module is a
+# single sparse product of the adjacency matrix and the (sparse) module
+# membership matrix, and the within-module degree z-scores, participation
+# coefficients and node roles all follow from it by vectorized operations,
+# with no loop over modules or nodes.
+#
+
+import numpy as np
+from scipy import sparse
+
+
+##### module degrees
+def module_degree(A, labels):
+    '''
+    A function to count the edges from each node to each module.
+    input parameters:
+          A:        A symmetric sparse adjacency matrix.
+          labels:   A vector of the module label of each node (any labels,
+                    e.g., a Louvain partition in the node order of A).
+    returns:
+          KM:       A sparse matrix of the number of edges from each node
+                    (row) to each module (column).
+          modInd:   A vector of the module index (the column of KM) of each
+                    node.
+    '''
+    modList, modInd = np.unique(np.asarray(labels), return_inverse=True)
+    nNodes = len(modInd)
+    M = sparse.csr_matrix((np.ones(nNodes, dtype=np.int32),
+                           (np.arange(nNodes), modInd)),
+                          shape=(nNodes, len(modList)))
+    A = (sparse.csr_matrix(A)!=0).astype(np.int32)
+    KM = A.dot(M).tocsr()
+    return KM, modInd
+
+
+
+##### z-score and participation coefficient
+def within_module_z(KM, modInd):
+    '''
+    A function to calculate the within-module degree z-score of each node,
+    the z-score of the number of edges to its own module among the nodes of
+    the module. The z-score is 0 in modules where all the nodes have the
+    same within-module degree.
+    '''
+    nMod = KM.shape[1]
+    kWithin = np.asarray(KM[np.arange(KM.shape[0]), modInd]).ravel()
+    nNodeMod = np.bincount(modInd, minlength=nMod)
+    meanK = np.bincount(modInd, weights=kWithin, minlength=nMod) / nNodeMod
+    varK = (np.bincount(modInd, weights=kWithin**2, minlength=nMod) /
+            nNodeMod - meanK**2)
+    sdK = np.sqrt(np.maximum(varK, 0))
+    Z = np.zeros(len(kWithin))
+    np.divide(kWithin - meanK[modInd], sdK[modInd], out=Z,
+              where=sdK[modInd]>1e-12)
+    return Z
+
+
+def participation_coef(KM):
+    '''
+    A function to calculate the participation coefficient of each node,
+    1 - sum over modules of (edges to the module / degree)^2. The
+    participation coefficient is 0 for isolated nodes.
+    '''
+    K = np.asarray(KM.sum(axis=1)).ravel().astype(np.float64)
+    sumSq = np.asarray(KM.multiply(KM).sum(axis=1)).ravel()
+    PC = np.zeros(len(K))
+    np.subtract(1, sumSq / np.maximum(K, 1)**2, out=PC, where=K>0)
+    return PC
+
+
+def node_roles(Z, PC, zHub=2.5):
+    '''
+    A function to assign the Guimera-Amaral roles:
+          1: ultra-peripheral node  (non-hub, PC <= 0.05)
+          2: peripheral node        (non-hub, PC <= 0.63)
+          3: non-hub connector node (non-hub, PC <= 0.8)
+          4: non-hub kinless node   (non-hub, PC > 0.8)
+          5: provincial hub         (hub, PC <= 0.3)
+          6: connector hub          (hub, PC <= 0.75)
+          7: kinless hub            (hub, PC > 0.75)
+    where hubs are the nodes with Z >= zHub (the default is 2.5).
+    '''
+    roleNonHub = 1 + np.digitize(PC, [0.05, 0.63, 0.8], right=True)
+    roleHub = 5 + np.digitize(PC, [0.3, 0.75], right=True)
+    return np.where(Z>=zHub, roleHub, roleNonHub)
+
+
+
+##### all the cartography measures
+def cartography(A, labels, zHub=2.5):
+    '''
+    A function to calculate the network cartography of a network.
+    input parameters:
+          A:        A symmetric sparse adjacency matrix.
+          labels:   A vector of the module label of each node, in the node
+                    order of A.
+          zHub:     The z-score threshold for hubs. The default is 2.5.
+    returns:
+          K:        A vector of node degrees.
+          Z:        A vector of within-module degree z-scores.
+          PC:       A vector of participation coefficients.
+          Role:     A vector of node roles, 1-7 (see node_roles).
+    '''
+    KM, modInd = module_degree(A, labels)
+    K = np.asarray(KM.sum(axis=1)).ravel()
+    Z = within_module_z(KM, modInd)
+    PC = participation_coef(KM)
+    Role = node_roles(Z, PC, zHub)
+    return K, Z, PC, Role
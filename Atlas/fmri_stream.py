@@ -0,0 +1,118 @@
+#
+# fmri_stream.py
+#
+# reads and writes 4D fMRI images in chunks of time points, so that the
+# whole 4D volume never has to be in memory. Reading goes through the
+# nibabel array proxy (memory-mapped for uncompressed .nii files), and
+# writing streams volume after volume into the output file.
+#
+
+import numpy as np
+import nibabel as nib
+from nibabel.openers import ImageOpener
+
+
+##### function to open an fMRI image without reading the voxel data
+def open_fmri(fMRI):
+    '''
+    A function to open a NIfTI image without decoding the voxel data.
+    input parameters:
+          fMRI:     A file name, or an already loaded nibabel image.
+    returns:
+          img:      The nibabel image. Only the header is read; the voxel
+                    data are accessed later through img.dataobj.
+    '''
+    if isinstance(fMRI, str):
+        return nib.load(fMRI, mmap='r')
+    return fMRI
+
+
+
+##### function to determine the number of time points per chunk
+def chunk_length(img, chunkMB=256):
+    '''
+    A function to determine how many time points of a 4D image fit in a
+    chunk of chunkMB megabytes (as float64).
+    input parameters:
+          img:      A nibabel image (4D).
+          chunkMB:  The memory budget for a chunk, in megabytes.
+    returns:
+          nChunk:   The number of time points in a chunk (at least 1).
+    '''
+    volBytes = np.prod(img.shape[:3]) * 8.0
+    nChunk = int(chunkMB * 2**20 // volBytes)
+    return max(1, min(nChunk, img.shape[-1]))
+
+
+
+##### generator to walk through a 4D image in time chunks
+def iter_fmri_chunks(fMRI, chunkMB=256):
+    '''
+    A generator to read a 4D fMRI image, a chunk of time points at a time.
+    input parameters:
+          fMRI:     A file name, a nibabel image, or a 4D array.
+          chunkMB:  The memory budget for a chunk, in megabytes.
+    yields:
+          tStart:   The first time point of the chunk.
+          tEnd:     One past the last time point of the chunk.
+          X:        The 4D array of the chunk, X[:,:,:,tStart:tEnd].
+    '''
+    if isinstance(fMRI, np.ndarray):
+        dataobj = fMRI
+        volBytes = np.prod(fMRI.shape[:3]) * 8.0
+        nChunk = max(1, int(chunkMB * 2**20 // volBytes))
+    else:
+        img = open_fmri(fMRI)
+        dataobj = img.dataobj
+        nChunk = chunk_length(img, chunkMB)
+    nTime = dataobj.shape[-1]
+    for tStart in range(0, nTime, nChunk):
+        tEnd = min(tStart + nChunk, nTime)
+        yield tStart, tEnd, np.asarray(dataobj[..., tStart:tEnd])
+
+
+
+##### function to write a 4D image from a sequence of time chunks
+def write_fmri_chunks(fout, hdrRef, chunks, dtype=np.float32):
+    '''
+    A function to write a 4D NIfTI image chunk by chunk, without building
+    the whole 4D array in memory.
+    input parameters:
+          fout:     The output file name (.nii or .nii.gz).
+          hdrRef:   A NIfTI header to take the image geometry (shape,
+                    affine, voxel size) from.
+          chunks:   An iterable of 4D arrays, X[:,:,:,tStart:tEnd], in the
+                    order of time. Their time points have to add up to the
+                    number of time points in hdrRef.
+          dtype:    The data type of the output image. The default is
+                    float32.
+    '''
+    hdr = nib.Nifti1Header.from_header(hdrRef)
+    hdr.set_data_dtype(dtype)
+    hdr.set_slope_inter(1, 0)
+    hdr['vox_offset'] = 0
+    outType = np.dtype(dtype).newbyteorder(hdr.endianness)
+    with ImageOpener(fout, 'wb') as fobj:
+        hdr.write_to(fobj)
+        fobj.write(b'\x00' * (int(hdr['vox_offset']) - fobj.tell()))
+        # the last dimension is the slowest in NIfTI, so each chunk is a
+        # contiguous block of volumes in the file
+        for X in chunks:
+            fobj.write(np.asarray(X, dtype=outType).tobytes(order='F'))
+
+
+
+##### function to get the number of time points from the header only
+def fmri_ntime(fMRI):
+    '''
+    A function to get the number of time points of a 4D fMRI image from
+    its NIfTI header, without decoding the voxel data.
+    input parameters:
+          fMRI:     A file name, or a nibabel image.
+    returns:
+          nTime:    The number of time points (1 for a 3D image).
+    '''
+    dataShape = open_fmri(fMRI).header.get_data_shape()
+    if len(dataShape)<4:
+        return 1
+    return dataShape[3]
@@ -0,0 +1,165 @@
+#
+# graph_store.py
+#
+# a compact, binary on-disk format for (large) networks. A graph is stored
+# as a directory of .npy files -- the CSR adjacency (indptr, indices),
+# optional float32 edge weights, node IDs, optional xyz coordinates --
+# plus a meta.json file with provenance (threshold, K, source, ...).
+# The arrays are memory-mapped on read, so even voxel-level networks load
+# in milliseconds. Converters to and from .adjlist files are included.
+#
+
+import os
+import json
+import numpy as np
+import networkx as nx
+from scipy import sparse
+from net_builder import csr_to_graph, csr_graph_view
+
+
+##### function to write a graph
+def save_graph(fGraph, A, nodes, weights=None, xyz=None, meta=None):
+    '''
+    A function to write a network in the binary graph format.
+    input parameters:
+          fGraph:   The output directory name (e.g., 'Net_K200_deg10.graph').
+          A:        The adjacency matrix (scipy.sparse or dense array).
+                    Non-zero elements are edges.
+          nodes:    A vector of node IDs, one for each row of A.
+          weights:  Edge weights. True to store the values of A as the
+                    weights, or a sparse/dense matrix of the same shape as A
+                    to take the weights from. The default is None (binary).
+          xyz:      An array of node coordinates (optional).
+          meta:     A dictionary of provenance information, e.g., the
+                    threshold, target degree or source file (optional).
+    '''
+    A = sparse.csr_matrix(A)
+    A.sum_duplicates()
+    A.eliminate_zeros()
+    A.sort_indices()
+    if not os.path.isdir(fGraph):
+        os.makedirs(fGraph)
+    np.save(os.path.join(fGraph, 'indptr.npy'), A.indptr.astype(np.int64))
+    np.save(os.path.join(fGraph, 'indices.npy'), A.indices.astype(np.int32))
+    np.save(os.path.join(fGraph, 'nodes.npy'), np.asarray(nodes))
+    fWeights = os.path.join(fGraph, 'weights.npy')
+    if weights is None:
+        if os.path.isfile(fWeights):
+            os.remove(fWeights)
+    else:
+        if weights is True:
+            W = A.data
+        elif sparse.issparse(weights):
+            W = np.asarray(sparse.csr_matrix(weights)[A.nonzero()]).ravel()
+        else:
+            W = np.asarray(weights)[A.nonzero()]
+        np.save(fWeights, np.asarray(W, dtype=np.float32))
+    fXYZ = os.path.join(fGraph, 'xyz.npy')
+    if xyz is not None:
+        np.save(fXYZ, np.asarray(xyz))
+    elif os.path.isfile(fXYZ):
+        os.remove(fXYZ)
+    metaOut = {'nNodes': int(A.shape[0]), 'nEdges': int(A.nnz//2)}
+    if meta is not None:
+        metaOut.update(meta)
+    with open(os.path.join(fGraph, 'meta.json'), 'w') as f:
+        json.dump(metaOut, f, indent=1, default=float)
+
+
+
+##### function to read a graph
+def load_graph(fGraph, mmap=True):
+    '''
+    A function to read a network in the binary graph format.
+    input parameters:
+          fGraph:   The graph directory name.
+          mmap:     If True (the default), the arrays are memory-mapped
+                    instead of read into memory.
+    returns:
+          A:        The adjacency matrix, as a scipy.sparse CSR matrix. The
+                    values are the edge weights if stored, otherwise 1.
+          nodes:    A vector of node IDs, one for each row of A.
+          xyz:      The node coordinates (None if not stored).
+          meta:     A dictionary of provenance information.
+    '''
+    mmapMode = 'r' if mmap else None
+    def load_array(fName):
+        fFull = os.path.join(fGraph, fName)
+        if os.path.isfile(fFull):
+            return np.load(fFull, mmap_mode=mmapMode)
+        return None
+    indptr = load_array('indptr.npy')
+    indices = load_array('indices.npy')
+    nodes = load_array('nodes.npy')
+    xyz = load_array('xyz.npy')
+    W = load_array('weights.npy')
+    if W is None:
+        W = np.ones(len(indices), dtype=np.int8)
+    A = sparse.csr_matrix((W, indices, indptr),
+                          shape=(len(nodes), len(nodes)), copy=False)
+    with open(os.path.join(fGraph, 'meta.json')) as f:
+        meta = json.load(f)
+    return A, nodes, xyz, meta
+
+
+def load_graph_nx(fGraph):
+    '''
+    A function to read a network in the binary graph format as a networkX
+    graph (edge weights, if any, are not carried over).
+    '''
+    A, nodes, xyz, meta = load_graph(fGraph)
+    return csr_to_graph(A, nodes)
+
+
+
+##### converters from / to adjacency list files
+def read_adjlist_csr(fAdj, nodetype=str):
+    '''
+    A function to read an .adjlist file (as written by nx.write_adjlist)
+    directly into a sparse adjacency matrix, without building a networkX
+    graph.
+    input parameters:
+          fAdj:     The .adjlist file name.
+          nodetype: The type of the node IDs (e.g., int). The default is str.
+    returns:
+          A:        The symmetric binary adjacency matrix (CSR).
+          nodes:    A vector of node IDs, in the order of first appearance
+                    in the file (as in nx.read_adjlist).
+    '''
+    nodeIndex = {}
+    listI = []
+    listJ = []
+    with open(fAdj) as f:
+        for line in f:
+            line = line.split('#')[0].split()
+            if len(line)==0:
+                continue
+            iNode = nodeIndex.setdefault(line[0], len(nodeIndex))
+            for jLabel in line[1:]:
+                listI.append(iNode)
+                listJ.append(nodeIndex.setdefault(jLabel, len(nodeIndex)))
+    nodes = np.array([nodetype(x) for x in nodeIndex])
+    A = sparse.coo_matrix((np.ones(len(listI)), (listI, listJ)),
+                          shape=(len(nodes), len(nodes))).tocsr()
+    A = ((A + A.T)>0).astype(np.int8)
+    return A, nodes
+
+
+def adjlist_to_graph(fAdj, fGraph, nodetype=str, xyz=None, meta=None):
+    '''
+    A function to convert an .adjlist file to the binary graph format.
+    '''
+    A, nodes = read_adjlist_csr(fAdj, nodetype)
+    metaOut = {'source': os.path.basename(fAdj)}
+    if meta is not None:
+        metaOut.update(meta)
+    save_graph(fGraph, A, nodes, xyz=xyz, meta=metaOut)
+
+
+def graph_to_adjlist(fGraph, fAdj):
+    '''
+    A function to write a graph in the binary graph format as an .adjlist
+    file (readable by nx.read_adjlist).
+    '''
+    A, nodes, xyz, meta = load_graph(fGraph)
+    nx.write_adjlist(csr_graph_view(A, nodes), fAdj)
@@ -0,0 +1,536 @@
+#
+# net_builder.py
+#
+# network construction functions, based on a correlation matrix. Shared
+# by the network construction scripts across the course directories.
+#
+
+import numpy as np
+import networkx as nx
+from collections.abc import Mapping
+from scipy import sparse
+
+
+##### functions to work with the upper triangle of a correlation matrix
+def conn_transform(X, cType=1):
+    '''
+    A function to transform an array of connectivity values depending on
+    the connectivity type (1: as is, 0: absolute value, -1: negated). The
+    array is transformed in place, so it should be a working copy.
+    '''
+    if cType==0:
+        np.abs(X, out=X)
+    elif cType==-1:
+        np.negative(X, out=X)
+    return X
+
+
+def vec_upper(R, cType=1):
+    '''
+    A function to extract the upper triangle (without the diagonal) of a
+    correlation matrix as a vector, depending on the connectivity type.
+    input parameters:
+          R:         A dense correlation matrix array.
+          cType:     Type of functional connectivity.
+                        1:  Positive correlation only
+                        0:  Both positive and negative correlations
+                        -1: Negative correlation only
+                     The default is 1 (i.e., positive correlation only).
+    returns:
+          VecR:      The upper triangle elements, in the same order as
+                     np.triu_indices. nan is replaced by -inf.
+    '''
+    R = np.asarray(R)
+    NNodes = R.shape[0]
+    # copied a row at a time, with no N x N mask or index arrays
+    VecR = np.empty(NNodes*(NNodes-1)//2, dtype=np.float64)
+    iStart = 0
+    for i in range(NNodes-1):
+        VecR[iStart:(iStart+NNodes-i-1)] = R[i,(i+1):]
+        iStart += NNodes-i-1
+    VecR = conn_transform(VecR, cType)
+    VecR[np.isnan(VecR)] = -np.inf
+    return VecR
+
+
+def triu_to_ij(indVec, NNodes):
+    '''
+    A function to convert indices of the upper triangle vector (as in
+    np.triu_indices(NNodes, 1)) to row and column indices.
+    '''
+    indVec = np.asarray(indVec)
+    # first vector index of each row
+    rowStart = np.cumsum(np.arange(NNodes-1, 0, -1)) - np.arange(NNodes-1, 0, -1)
+    I = np.searchsorted(rowStart, indVec, side='right') - 1
+    J = indVec - rowStart[I] + I + 1
+    return I, J
+
+
+
+##### function to pick the largest elements of a vector
+def top_m(VecR, m):
+    '''
+    A function to select the m largest elements of VecR by partial
+    selection (O(len(VecR))). Ties are broken deterministically, in favor
+    of the element with the smaller index.
+    input parameters:
+          VecR:      A vector of connectivity values.
+          m:         The number of elements to be selected.
+    returns:
+          indSel:    The indices of the selected elements, sorted by
+                     decreasing value (ties in increasing index order).
+          RTh:       The threshold, i.e., the smallest selected value.
+    '''
+    m = int(min(m, len(VecR)))
+    if m<=0:
+        return np.zeros(0, dtype=np.intp), np.inf
+    RTh = np.partition(VecR, len(VecR)-m)[len(VecR)-m]
+    indGT = np.flatnonzero(VecR>RTh)
+    indEQ = np.flatnonzero(VecR==RTh)[:m-len(indGT)]
+    indSel = np.sort(np.concatenate((indGT, indEQ)))
+    indSel = indSel[np.argsort(-VecR[indSel], kind='stable')]
+    return indSel, RTh
+
+
+
+##### sparse (CSR) adjacency output, and the adapter to networkX
+def edges_to_adj(trI, trJ, NNodes):
+    '''
+    a function to convert an edge list (row and column indices) to a
+    symmetric binary scipy.sparse CSR adjacency matrix.
+    '''
+    A = sparse.coo_matrix((np.ones(len(trI)), (trI, trJ)),
+                          shape=(NNodes, NNodes)).tocsr()
+    return ((A + A.T)>0).astype(np.int8)
+
+
+def csr_to_graph(A, NodeInd):
+    '''
+    a function to convert a sparse adjacency matrix (as returned by the
+    network builders with output='csr') to a networkX graph that can be
+    modified. To run networkX algorithms on the matrix without building
+    the graph, see csr_graph_view.
+    input parameters:
+          A:         A symmetric scipy.sparse adjacency matrix.
+          NodeInd:   A list of node labels, one for each row of A.
+    returns:
+          G:         The graph (networkX format)
+    '''
+    NodeInd = np.asarray(NodeInd)
+    trI, trJ = sparse.triu(A).nonzero()
+    G = nx.Graph()
+    G.add_nodes_from(NodeInd)
+    G.add_edges_from(zip(NodeInd[trI], NodeInd[trJ]))
+    return G
+
+
+
+class CSRAdjacency(Mapping):
+    '''
+    A read-only, dict-like adjacency (node -> {neighbor: edge data}) over a
+    sparse adjacency matrix, as networkX expects in G._adj. The neighbor
+    dictionary of a node is built the first time the node is accessed, and
+    then kept.
+    '''
+    def __init__(self, A, NodeInd, nodeIndex):
+        self.A = A
+        self.NodeInd = NodeInd
+        self.nodeIndex = nodeIndex
+        self.nbrDict = {}
+
+    def __getitem__(self, node):
+        if node not in self.nbrDict:
+            i = self.nodeIndex[node]
+            nbrs = self.A.indices[self.A.indptr[i]:self.A.indptr[i+1]]
+            self.nbrDict[node] = {x: {} for x in self.NodeInd[nbrs].tolist()}
+        return self.nbrDict[node]
+
+    def __iter__(self):
+        return iter(self.nodeIndex)
+
+    def __len__(self):
+        return len(self.nodeIndex)
+
+    def __contains__(self, node):
+        return node in self.nodeIndex
+
+
+class CSRGraph(nx.Graph):
+    '''
+    A lazy, read-only networkX graph over a sparse adjacency matrix (see
+    csr_graph_view). Without arguments, an ordinary empty graph (as
+    networkX creates for copies and subgraphs).
+    '''
+    def __init__(self, A=None, NodeInd=None, **attr):
+        super().__init__(**attr)
+        if A is None:
+            return
+        A = sparse.csr_matrix(sparse.csr_matrix(A)!=0)  # (a new matrix)
+        A.sort_indices()
+        NodeInd = np.asarray(NodeInd)
+        nodeIndex = {x: i for i, x in enumerate(NodeInd.tolist())}
+        self._node = {x: {} for x in nodeIndex}
+        self._adj = CSRAdjacency(A, NodeInd, nodeIndex)
+        nx.freeze(self)
+
+
+def csr_graph_view(A, NodeInd):
+    '''
+    A function to wrap a sparse adjacency matrix (as returned by the
+    network builders with output='csr') as a read-only networkX graph,
+    without building the graph: the neighbors of a node are converted to a
+    dictionary only when a networkX algorithm first asks for them. The
+    graph cannot be modified (nx.freeze); use csr_to_graph, or G.copy(),
+    for a graph that can be.
+    input parameters:
+          A:         A symmetric scipy.sparse adjacency matrix.
+          NodeInd:   A list of node labels, one for each row of A.
+    returns:
+          G:         The graph view (a frozen networkX graph).
+    '''
+    return CSRGraph(A, NodeInd)
+
+
+
+###### Network construction functions, based on correlation matrix
+
+def hard_threshold_edges(R, K, cType=1):
+    '''
+    a function to find the edges of the hard-thresholded network, i.e.,
+    the ceil(K*N/2) strongest connections in the upper triangle of R.
+    input parameters:
+          R:         A dense correlation matrix array.
+          K:         The target K, the average connections at each node
+          cType:     Type of functional connectivity (see vec_upper).
+    returns:
+          trI, trJ:  Row and column indices of the edges, from the
+                     strongest to the weakest connection.
+          RTh:       The threshold, i.e., the weakest connection included
+                     (after the cType transformation).
+    '''
+    NNodes = R.shape[0]
+    VecR = vec_upper(R, cType)
+    m = int(np.ceil(K*NNodes/2.0))  # the number of edges
+    indSel, RTh = top_m(VecR, m)
+    trI, trJ = triu_to_ij(indSel, NNodes)
+    return trI, trJ, RTh
+
+
+def net_builder_HardTh(R, NodeInd, K, cType=1, returnTh=False,
+                       output='graph'):
+    '''
+    a function to construct the network by the hard-thresholding.
+    input parameters:
+          R:         A dense correlation matrix array.
+          NodeInd:   A list of nodes in the network.
+          K:         The target K, the average connections at each node
+          cType:     Type of functional connectivity.
+                        1:  Positive correlation only
+                        0:  Both positive and negative correlations
+                        -1: Negative correlation only
+                     The default is 1 (i.e., positive correlation only).
+          returnTh:  If True, the threshold RTh is returned as well.
+                     The default is False.
+          output:    'graph' for a networkX graph (the default), or 'csr'
+                     for a sparse adjacency matrix and the node labels.
+
+    returns:
+          G:         The resulting graph (networkX format). With
+                     output='csr', a tuple (A, NodeInd) of the symmetric
+                     binary CSR adjacency matrix and the node labels of
+                     its rows.
+          RTh:       The threshold (only if returnTh is True)
+    '''
+
+    # the strongest connections, by partial selection
+    NodeInd = np.asarray(NodeInd)
+    trI, trJ, RTh = hard_threshold_edges(R, K, cType)
+    if output=='csr':
+        G = (edges_to_adj(trI, trJ, len(NodeInd)), NodeInd)
+        return (G[0], G[1], RTh) if returnTh else G
+    # first, initialize the graph
+    G = nx.Graph()
+    G.add_nodes_from(NodeInd)
+    # then adding edges
+    Elist = np.vstack((NodeInd[trI], NodeInd[trJ])).T
+    G.add_edges_from(Elist)
+    # finally returning the resultant graph (and the threshold)
+    if returnTh:
+        return G, RTh
+    return G
+
+
+
+def hard_threshold_sweep(R, listK, cType=1):
+    '''
+    a function to find the edges of hard-thresholded networks at many
+    target degrees, from a single ranking of the connections. The edge
+    sets are nested: the network at a given K consists of the first mList
+    edges in trI and trJ, and is identical to hard_threshold_edges(R, K).
+    input parameters:
+          R:         A dense correlation matrix array.
+          listK:     A list of target K (average connections at each node).
+          cType:     Type of functional connectivity (see vec_upper).
+    returns:
+          trI, trJ:  Row and column indices of the edges of the densest
+                     network, from the strongest to the weakest connection.
+          mList:     The number of edges for each K in listK.
+          RThList:   The threshold for each K in listK.
+    '''
+    NNodes = R.shape[0]
+    VecR = vec_upper(R, cType)
+    mList = [int(np.ceil(K*NNodes/2.0)) for K in listK]
+    indSel, RTh = top_m(VecR, max(mList))
+    mList = [min(m, len(indSel)) for m in mList]
+    RThList = [VecR[indSel[m-1]] if m>0 else np.inf for m in mList]
+    trI, trJ = triu_to_ij(indSel, NNodes)
+    return trI, trJ, mList, RThList
+
+
+def net_builder_sweep(R, NodeInd, listK, cType=1, func=None, output='graph'):
+    '''
+    a function to construct hard-thresholded networks at many target
+    degrees. The connections are ranked once, and a single graph is grown
+    edge by edge from the sparsest to the densest network, so building
+    many densities costs about the same as building the densest one.
+    input parameters:
+          R:         A dense correlation matrix array.
+          NodeInd:   A list of nodes in the network.
+          listK:     A list of target K (average connections at each node).
+          cType:     Type of functional connectivity (see vec_upper).
+          func:      A function taking a graph, e.g., nx.average_clustering.
+                     If given, it is evaluated on the network at each K
+                     (without copying the graph), and its results are
+                     returned instead of the graphs. The default is None.
+          output:    'graph' for networkX graphs (the default), or 'csr' for
+                     sparse adjacency matrices. With 'csr', func (if any)
+                     is called with the adjacency matrix.
+    returns:
+          GList:     A list of graphs (networkX format), of CSR adjacency
+                     matrices (rows in the order of NodeInd), or of func
+                     results, in the same order as listK.
+    '''
+    NodeInd = np.asarray(NodeInd)
+    trI, trJ, mList, RThList = hard_threshold_sweep(R, listK, cType)
+    if output=='csr':
+        GList = []
+        for m in mList:
+            A = edges_to_adj(trI[:m], trJ[:m], len(NodeInd))
+            GList.append(A if func is None else func(A))
+        return GList
+    G = nx.Graph()
+    G.add_nodes_from(NodeInd)
+    GList = [None] * len(listK)
+    mPrev = 0
+    # growing the graph, from the sparsest network to the densest
+    for iK in np.argsort(mList, kind='stable'):
+        m = mList[iK]
+        Elist = np.vstack((NodeInd[trI[mPrev:m]], NodeInd[trJ[mPrev:m]])).T
+        G.add_edges_from(Elist)
+        mPrev = max(m, mPrev)
+        if func is None:
+            GList[iK] = G.copy()
+        else:
+            GList[iK] = func(G)
+    return GList
+
+
+
+def rank_select_rows(WorkR, d):
+    '''
+    a function to select the d largest positive elements in each row of a
+    block of a connectivity matrix, with ties resolved toward the smaller
+    column index.
+    input parameters:
+          WorkR:     A block of rows of the (cType-transformed) connectivity
+                     matrix, without nan.
+          d:         The rank threshold.
+    returns:
+          trI, trJ:  Row (within the block) and column indices of the
+                     selected elements.
+    '''
+    d = int(min(d, WorkR.shape[1]))
+    if d<=0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    # the d-th largest value of each row
+    RThRow = -np.partition(-WorkR, d-1, axis=1)[:,d-1:d]
+    # entries above it, then ties at it in column order, up to d
+    selGT = WorkR>RThRow
+    selEQ = WorkR==RThRow
+    nLeft = d - np.sum(selGT, axis=1, keepdims=True)
+    selR = (selGT | (selEQ & (np.cumsum(selEQ, axis=1)<=nLeft))) & (WorkR>0)
+    return np.nonzero(selR)
+
+
+def rank_threshold_adj(R, d, cType=1, blockSize=None):
+    '''
+    a function to find the edges of the rank-thresholded network, i.e.,
+    the d strongest positive connections of every node, with one row-wise
+    partial selection per block of rows (no copy of the full matrix).
+    input parameters:
+          R:         A dense correlation matrix array.
+          d:         The rank threshold for the rank-based thresholding.
+          cType:     Type of functional connectivity (see vec_upper).
+          blockSize: The number of rows processed at a time. The default is
+                     None, meaning blocks of about 10 million elements.
+    returns:
+          A:         The adjacency matrix of the union of the edges of all
+                     nodes, as a symmetric binary scipy.sparse CSR matrix.
+                     Only connections >0 (after the cType transformation)
+                     are edges, ties are resolved toward the smaller column
+                     index, and nan is treated as no connection.
+    '''
+    R = np.asarray(R)
+    NNodes = R.shape[0]
+    if blockSize is None:
+        blockSize = max(1, int(1e7 // NNodes))
+    listI = [np.zeros(0, dtype=np.intp)]
+    listJ = [np.zeros(0, dtype=np.intp)]
+    for iStart in range(0, NNodes, blockSize):
+        # a block of rows, depending on the connectivity type
+        WorkR = conn_transform(np.array(R[iStart:(iStart+blockSize)],
+                                        dtype=np.float64), cType)
+        WorkR[np.isnan(WorkR)] = 0
+        trI, trJ = rank_select_rows(WorkR, d)
+        listI.append(trI + iStart)
+        listJ.append(trJ)
+    # the union of the edges, as a symmetric adjacency matrix
+    return edges_to_adj(np.hstack(listI), np.hstack(listJ), NNodes)
+
+
+def net_builder_RankTh(R, NodeInd, d, cType=1, output='graph'):
+    '''
+    a function to construct the network by the rank-based thresholding
+
+    input parameters:
+          R:         A dense correlation matrix array.
+          NodeInd:   A list of nodes in the network.
+          d:         The rank threshold for the rank-based thresholding.
+          cType:     Type of functional connectivity.
+                        1:  Positive correlation only
+                        0:  Both positive and negative correlations
+                        -1: Negative correlation only
+                     The default is 1 (i.e., positive correlation only).
+          output:    'graph' for a networkX graph (the default), or 'csr'
+                     for a sparse adjacency matrix and the node labels.
+    returns:
+          G:         The resulting graph (networkX format). With
+                     output='csr', a tuple (A, NodeInd) of the symmetric
+                     binary CSR adjacency matrix and the node labels of
+                     its rows.
+    '''
+
+    # the d strongest connections of every node
+    NodeInd = np.asarray(NodeInd)
+    A = rank_threshold_adj(R, d, cType)
+    if output=='csr':
+        return A, NodeInd
+    # finally returning the resultant graph
+    return csr_to_graph(A, NodeInd)
+
+
+
+###### Network construction from time series, without the full R matrix
+
+def standardize_ts(ts, dtype=np.float64):
+    '''
+    A function to standardize time series (columns of ts), so that the
+    correlation matrix is simply Z.T Z. Columns with zero variance are set
+    to zero (i.e., no correlation with anything).
+    '''
+    Z = np.array(ts, dtype=dtype)
+    Z -= np.mean(Z, axis=0)
+    normZ = np.sqrt(np.sum(Z**2, axis=0))
+    normZ[normZ==0] = np.inf
+    Z /= normZ
+    return Z
+
+
+def corr_block(Z, iStart, iEnd, cType=1):
+    '''
+    A function to calculate rows iStart to iEnd-1 of the correlation
+    matrix from standardized time series Z, with the diagonal set to zero.
+    '''
+    WorkR = np.dot(Z[:,iStart:iEnd].T, Z)
+    conn_transform(WorkR, cType)
+    WorkR[np.arange(iEnd-iStart), np.arange(iStart, iEnd)] = 0
+    return WorkR
+
+
+def corr_builder_HardTh(ts, K, cType=1, blockSize=1000, dtype=np.float64):
+    '''
+    a function to construct the hard-thresholded network (the ceil(K*N/2)
+    strongest connections, as in net_builder_HardTh) directly from time
+    series. The correlation matrix is calculated in blocks of rows, and
+    only a running set of the strongest connections is kept, so the peak
+    memory is O(N x blockSize) rather than O(N x N).
+    input parameters:
+          ts:        An array of time series. Rows correspond to time
+                     points, the columns corresponds to nodes (e.g., voxels).
+          K:         The target K, the average connections at each node
+          cType:     Type of functional connectivity (see vec_upper).
+          blockSize: The number of rows of R calculated at a time.
+          dtype:     The data type for the calculation. np.float32 halves
+                     the memory. The default is np.float64.
+    returns:
+          A:         The adjacency matrix, as a symmetric binary
+                     scipy.sparse CSR matrix.
+          RTh:       The threshold, i.e., the weakest connection included.
+    '''
+    Z = standardize_ts(ts, dtype)
+    NNodes = Z.shape[1]
+    m = int(np.ceil(K*NNodes/2.0))  # the number of edges
+    # running set of the strongest connections (in upper triangle order)
+    bestR = np.zeros(0)
+    bestInd = np.zeros(0, dtype=np.int64)
+    for iStart in range(0, NNodes, blockSize):
+        iEnd = min(iStart+blockSize, NNodes)
+        WorkR = corr_block(Z, iStart, iEnd, cType)
+        # upper triangle part of the block, in np.triu_indices order
+        I, J = np.nonzero(np.arange(NNodes)[np.newaxis,:] >
+                          np.arange(iStart, iEnd)[:,np.newaxis])
+        VecR = WorkR[I, J].astype(np.float64)
+        VecR[np.isnan(VecR)] = -np.inf
+        I += iStart
+        indVec = I*NNodes - I*(I+1)//2 + (J - I - 1)
+        # keeping the strongest m among the old and new candidates
+        indSel, RTh = top_m(VecR, m)
+        indSel = np.sort(indSel)
+        candR = np.concatenate((bestR, VecR[indSel]))
+        candInd = np.concatenate((bestInd, indVec[indSel]))
+        indSel, RTh = top_m(candR, m)
+        indSel = np.sort(indSel)
+        bestR = candR[indSel]
+        bestInd = candInd[indSel]
+    trI, trJ = triu_to_ij(bestInd, NNodes)
+    return edges_to_adj(trI, trJ, NNodes), RTh
+
+
+def corr_builder_RankTh(ts, d, cType=1, blockSize=1000, dtype=np.float64):
+    '''
+    a function to construct the rank-thresholded network (the d strongest
+    positive connections of every node, as in net_builder_RankTh)
+    directly from time series, calculating the correlation matrix in
+    blocks of rows. The peak memory is O(N x blockSize).
+    input parameters:
+          ts:        An array of time series (time points x nodes).
+          d:         The rank threshold for the rank-based thresholding.
+          cType:     Type of functional connectivity (see vec_upper).
+          blockSize: The number of rows of R calculated at a time.
+          dtype:     The data type for the calculation.
+    returns:
+          A:         The adjacency matrix, as a symmetric binary
+                     scipy.sparse CSR matrix.
+    '''
+    Z = standardize_ts(ts, dtype)
+    NNodes = Z.shape[1]
+    listI = [np.zeros(0, dtype=np.intp)]
+    listJ = [np.zeros(0, dtype=np.intp)]
+    for iStart in range(0, NNodes, blockSize):
+        iEnd = min(iStart+blockSize, NNodes)
+        WorkR = corr_block(Z, iStart, iEnd, cType)
+        WorkR[np.isnan(WorkR)] = 0
+        trI, trJ = rank_select_rows(WorkR, d)
+        listI.append(trI + iStart)
+        listJ.append(trJ)
+    return edges_to_adj(np.hstack(listI), np.hstack(listJ), NNodes)
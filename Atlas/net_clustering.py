@@ -0,0 +1,106 @@
+#
+# net_clustering.py
+#
+# clustering coefficients of binary, undirected networks given as sparse
+# adjacency matrices. The number of triangles at each node is counted by
+# sparse matrix products, (A A) .* A, a block of rows at a time (so the
+# memory for A A is bounded), and the local clustering coefficients, the
+# average clustering coefficient and the transitivity all come from the
+# same triangle counts. Lists of networks (e.g., a null ensemble, or the
+# networks of an atlas K sweep) are done across a pool of processes.
+#
+
+import numpy as np
+from scipy import sparse
+from multiprocessing import Pool
+
+
+##### triangle counts
+def binary_adj(A):
+    '''
+    A function to prepare an adjacency matrix for triangle counting: CSR,
+    binary, with no self-loops and no explicitly stored zeros.
+    '''
+    A = sparse.csr_matrix(A)
+    A = (A!=0).astype(np.int32)
+    A.setdiag(0)
+    A.eliminate_zeros()
+    return A
+
+
+def triangles(A, blockSize=5000):
+    '''
+    A function to count the triangles at each node.
+    input parameters:
+          A:          A symmetric sparse adjacency matrix.
+          blockSize:  The number of rows of A A calculated at a time. The
+                      default is 5000.
+    returns:
+          tri:        A vector of the number of triangles at each node.
+    '''
+    A = binary_adj(A)
+    NNodes = A.shape[0]
+    tri = np.zeros(NNodes, dtype=np.int64)
+    for iStart in range(0, NNodes, blockSize):
+        iEnd = min(iStart + blockSize, NNodes)
+        B = A[iStart:iEnd]
+        tri[iStart:iEnd] = np.asarray(B.dot(A).multiply(B).sum(axis=1)).ravel()
+    return tri // 2
+
+
+
+##### clustering coefficients
+def clustering(A, blockSize=5000):
+    '''
+    A function to calculate the local clustering coefficients, the average
+    clustering coefficient and the transitivity of a network, from a single
+    triangle count (as nx.clustering, nx.average_clustering and
+    nx.transitivity).
+    input parameters:
+          A:          A symmetric sparse adjacency matrix.
+          blockSize:  See triangles.
+    returns:
+          Ci:         A vector of the local clustering coefficient of each
+                      node (0 for nodes with degree < 2).
+          C:          The average clustering coefficient.
+          T:          The transitivity.
+    '''
+    A = binary_adj(A)
+    tri = triangles(A, blockSize)
+    deg = np.diff(A.indptr).astype(np.float64)
+    nTriads = deg*(deg-1)/2
+    Ci = np.zeros(len(deg))
+    np.divide(tri, nTriads, out=Ci, where=nTriads>0)
+    C = Ci.mean() if len(Ci)>0 else 0
+    T = tri.sum() / nTriads.sum() if nTriads.sum()>0 else 0
+    return Ci, C, T
+
+
+def clustering_worker(A):
+    '''
+    A function to calculate clustering in a worker process.
+    '''
+    return clustering(A)
+
+
+def clustering_batch(listA, nProc=1):
+    '''
+    A function to calculate the clustering coefficients of a list of
+    networks (see clustering), networks across worker processes.
+    input parameters:
+          listA:    A list of symmetric sparse adjacency matrices.
+          nProc:    The number of worker processes. The default is 1.
+    returns:
+          CiList:   A list of vectors of local clustering coefficients.
+          C:        A vector of the average clustering coefficients.
+          T:        A vector of the transitivities.
+    '''
+    if nProc<=1:
+        listOut = [clustering(A) for A in listA]
+    else:
+        with Pool(nProc) as pool:
+            listOut = pool.map(clustering_worker, listA)
+    CiList = [x[0] for x in listOut]
+    C = np.array([x[1] for x in listOut])
+    T = np.array([x[2] for x in listOut])
+    return CiList, C, T
@@ -0,0 +1,186 @@
+#
+# net_efficiency.py
+#
+# nodal global and local efficiency of binary, undirected networks given
+# as sparse adjacency matrices (as returned by the network builders with
+# output='csr'). Shortest path lengths come from the compiled breadth-first
+# search in scipy.sparse.csgraph, a block of source nodes at a time, and
+# the nodal efficiencies are reduced from the distance block in one go.
+# Local efficiency works on the neighborhood of each node directly (CSR
+# row slices and fancy indexing), with the nodes spread across processes.
+#
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+from multiprocessing import Pool
+
+
+##### function to calculate shortest path lengths
+def bfs_distances(A, indices=None):
+    '''
+    A function to calculate the shortest path lengths (number of edges)
+    from the source nodes in indices to all the nodes of the network.
+    input parameters:
+          A:        A symmetric sparse adjacency matrix.
+          indices:  A list of source nodes (row indices). The default is
+                    None, meaning all the nodes.
+    returns:
+          D:        An array of path lengths, sources x nodes. Unreachable
+                    nodes are at distance inf.
+    '''
+    return csgraph.shortest_path(A, method='D', directed=False,
+                                 unweighted=True, indices=indices)
+
+
+def inverse_distances(D):
+    '''
+    A function to calculate 1/D, with 0 for the distance of a node to
+    itself and for unreachable nodes.
+    '''
+    invD = np.zeros_like(D)
+    np.divide(1.0, D, out=invD, where=D>0)
+    return invD
+
+
+
+##### nodal global efficiency
+def nodal_eglob(A, blockSize=1000):
+    '''
+    A function to calculate the nodal global efficiency of every node,
+    i.e., the mean of the inverse shortest path lengths to the other nodes
+    (the same as eglob_node for each node).
+    input parameters:
+          A:          A symmetric sparse adjacency matrix.
+          blockSize:  The number of source nodes searched at a time, which
+                      bounds the memory used for the distances to
+                      blockSize x nodes. The default is 1000.
+    returns:
+          Eglobi:     A vector of nodal global efficiencies, in the order of
+                      the rows of A.
+    '''
+    A = sparse.csr_matrix(A)
+    NNodes = A.shape[0]
+    Eglobi = np.zeros(NNodes)
+    if NNodes<2:
+        return Eglobi
+    for iStart in range(0, NNodes, blockSize):
+        iEnd = min(iStart + blockSize, NNodes)
+        D = bfs_distances(A, np.arange(iStart, iEnd))
+        Eglobi[iStart:iEnd] = inverse_distances(D).sum(axis=1) / (NNodes-1.0)
+    return Eglobi
+
+
+
+##### nodal local efficiency
+def inverse_distance_sum(subA, denseMax=2000):
+    '''
+    A function to calculate the sum of inverse shortest path lengths over
+    all pairs of nodes of a (small) network. Networks of up to denseMax
+    nodes are searched all sources at once, one BFS level per dense matrix
+    product (much faster than a search per source for the neighborhood of
+    a node); larger networks go through bfs_distances.
+    '''
+    NNodes = subA.shape[0]
+    if NNodes>denseMax:
+        return inverse_distances(bfs_distances(subA)).sum()
+    M = (subA.toarray()!=0).astype(np.float32)
+    reach = np.eye(NNodes, dtype=bool)
+    front = reach.copy()
+    invDSum = 0.0
+    d = 0
+    while True:
+        d += 1
+        front = (np.dot(front.astype(np.float32), M)>0) & ~reach
+        nFront = np.count_nonzero(front)
+        if nFront==0:
+            break
+        invDSum += nFront / float(d)
+        reach |= front
+    return invDSum
+
+
+def eloc_nodes(A, listNodes):
+    '''
+    A function to calculate the nodal local efficiency of the nodes in
+    listNodes, i.e., the global efficiency of the subgraph induced by the
+    neighbors of each node (the node itself excluded). The neighbors come
+    from the CSR row of the node, the subgraph from fancy indexing of A,
+    and its path lengths from breadth-first search on the small subgraph
+    (see inverse_distance_sum).
+    input parameters:
+          A:          A symmetric sparse CSR adjacency matrix.
+          listNodes:  A list of nodes (row indices).
+    returns:
+          Eloci:      A vector of nodal local efficiencies, in the order of
+                      listNodes.
+    '''
+    Eloci = np.zeros(len(listNodes))
+    for i, xNode in enumerate(listNodes):
+        subNodes = A.indices[A.indptr[xNode]:A.indptr[xNode+1]]
+        subNodes = subNodes[subNodes!=xNode]
+        NNodes = len(subNodes)
+        if NNodes>1:
+            subA = A[subNodes][:,subNodes]
+            Eloci[i] = inverse_distance_sum(subA) / (NNodes*(NNodes-1.0))
+    return Eloci
+
+
+# the adjacency matrix, shared with the worker processes
+AWorker = None
+
+def init_worker(A):
+    '''
+    A function to keep the adjacency matrix in each worker process.
+    '''
+    global AWorker
+    AWorker = A
+
+def eloc_nodes_worker(listNodes):
+    '''
+    A function to calculate eloc_nodes in a worker process.
+    '''
+    return eloc_nodes(AWorker, listNodes)
+
+
+def nodal_eloc(A, nProc=1, blockSize=1000):
+    '''
+    A function to calculate the nodal local efficiency of every node (the
+    same as the global efficiency of the neighborhood subgraph in
+    nx.local_efficiency, for each node).
+    input parameters:
+          A:          A symmetric sparse adjacency matrix.
+          nProc:      The number of worker processes. The default is 1,
+                      meaning no parallel processing.
+          blockSize:  The number of nodes given to a worker at a time.
+                      The default is 1000.
+    returns:
+          Eloci:      A vector of nodal local efficiencies, in the order of
+                      the rows of A.
+    '''
+    A = sparse.csr_matrix(A)
+    A.sort_indices()
+    NNodes = A.shape[0]
+    if nProc<=1 or NNodes<=blockSize:
+        return eloc_nodes(A, np.arange(NNodes))
+    listBlocks = [np.arange(iStart, min(iStart + blockSize, NNodes))
+                  for iStart in range(0, NNodes, blockSize)]
+    with Pool(nProc, init_worker, (A,)) as pool:
+        Eloci = pool.map(eloc_nodes_worker, listBlocks)
+    return np.hstack(Eloci)
+
+
+def local_efficiency(A, nProc=1):
+    '''
+    A function to calculate the local efficiency of the network, i.e., the
+    average of the nodal local efficiencies (as nx.local_efficiency).
+    '''
+    return np.mean(nodal_eloc(A, nProc))
+
+
+def global_efficiency(A):
+    '''
+    A function to calculate the global efficiency of the network, i.e., the
+    average of the nodal global efficiencies (as nx.global_efficiency).
+    '''
+    return np.mean(nodal_eglob(A))
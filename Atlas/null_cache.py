@@ -0,0 +1,197 @@
+#
+# null_cache.py
+#
+# an on-disk cache of null network ensembles (see null_model.py), so that
+# the rewiring is done once per network and shared by every normalization
+# (rich club, clustering, path length, modularity, ...). An ensemble is
+# keyed by the SHA-1 hash of the network's edges and degree sequence, the
+# number of swaps, the seed and the connectivity constraint, and is stored
+# as a single .npy file of edge arrays in the smallest integer type that
+# holds the node indices. Since null network i always comes from the i-th
+# seed spawned from the ensemble seed, a cached ensemble is extended (not
+# regenerated) when more null networks are requested. Lattice reference
+# ensembles are cached in the same way. Metrics are then
+# evaluated over the ensemble in batch, across a pool of worker processes.
+#
+
+import os
+import hashlib
+import numpy as np
+import networkx as nx
+from multiprocessing import Pool
+from null_model import null_ensemble, edges_to_csr
+from net_builder import csr_graph_view
+from rich_club import rich_club_csr
+from path_length import char_path_length
+from net_clustering import clustering
+
+
+# the ensemble and the metric, shared with the worker processes
+ENullWorker = None
+nNodesWorker = None
+funcWorker = None
+
+
+##### the cache key
+def canonical_edges(E):
+    '''
+    A function to sort an edge array (the smaller node index first in each
+    edge, then the edges in lexicographic order), so that the same network
+    always gives the same edge array.
+    '''
+    E = np.sort(np.asarray(E, dtype=np.int64), axis=1)
+    return E[np.lexsort((E[:,1], E[:,0]))]
+
+
+def ensemble_key(E, nNodes, nSwap, seed, connected, model='random'):
+    '''
+    A function to calculate the cache key of a null ensemble, the SHA-1
+    hash of the (sorted) edges, the degree sequence and the parameters.
+    '''
+    E = canonical_edges(E)
+    deg = np.bincount(E.ravel(), minlength=nNodes)
+    h = hashlib.sha1(np.ascontiguousarray(E).tobytes())
+    h.update(deg.astype(np.int64).tobytes())
+    h.update(repr((int(nNodes), int(nSwap), int(seed), bool(connected),
+                   str(model))).encode())
+    return h.hexdigest()
+
+
+def index_dtype(nNodes):
+    '''
+    A function to determine the smallest integer type for node indices.
+    '''
+    for dtype in [np.uint8, np.uint16, np.uint32]:
+        if nNodes<=np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+
+##### the cached ensemble
+def cached_null_ensemble(E, nNodes, nNull, nSwap=None, seed=0,
+                         connected=False, cacheDir='NullCache', nProc=4,
+                         model='random'):
+    '''
+    A function to get an ensemble of degree-preserving null networks from
+    the cache, generating (and caching) the null networks not cached yet.
+    input parameters:
+          E:         An array of edges (edges x 2), node indices.
+          nNodes:    The number of nodes.
+          nNull:     The number of null networks.
+          nSwap:     The number of swaps per null network. The default is
+                     None, meaning 10 x the number of nodes.
+          seed:      The seed of the ensemble (an integer).
+          connected: If True, the null networks are kept connected.
+          cacheDir:  The cache directory. The default is 'NullCache'.
+          nProc:     The number of worker processes.
+          model:     'random' (the default) or 'lattice' (see null_ensemble).
+    returns:
+          ENull:     An array of edge arrays, null networks x edges x 2
+                     (memory-mapped if read from the cache).
+    '''
+    if nSwap is None:
+        nSwap = 10*nNodes
+    E = canonical_edges(E)
+    key = ensemble_key(E, nNodes, nSwap, seed, connected, model)
+    fCache = os.path.join(cacheDir, 'null_' + key + '.npy')
+    nCached = 0
+    if os.path.isfile(fCache):
+        ENull = np.load(fCache, mmap_mode='r')
+        nCached = ENull.shape[0]
+        if nCached>=nNull:
+            return ENull[:nNull]
+    # generating the null networks not cached yet
+    ENew = null_ensemble(E, nNodes, nNull-nCached, nSwap, seed, connected,
+                         nProc, iStart=nCached, model=model)
+    ENew = ENew.astype(index_dtype(nNodes))
+    if nCached>0:
+        ENew = np.concatenate((np.asarray(ENull), ENew))
+    if not os.path.isdir(cacheDir):
+        os.makedirs(cacheDir)
+    fTmp = fCache[:-4] + '_tmp' + str(os.getpid()) + '.npy'
+    np.save(fTmp, ENew)
+    os.replace(fTmp, fCache)
+    return np.load(fCache, mmap_mode='r')
+
+
+
+##### metrics of a network (CSR adjacency matrix)
+def rich_club(A):
+    '''
+    The (unnormalized) rich club coefficient at each degree k = 0, ...,
+    max degree - 1 (see rich_club_csr). For a whole ensemble at once, use
+    rich_club_stack or rich_club_norm directly.
+    '''
+    return rich_club_csr(A)[1]
+
+
+def avg_clustering(A):
+    '''
+    The average clustering coefficient, as in nx.average_clustering.
+    '''
+    return clustering(A)[1]
+
+
+def path_length(A):
+    '''
+    The characteristic path length of the giant component.
+    '''
+    return char_path_length(A)[0]
+
+
+def modularity(A, seed=0):
+    '''
+    The modularity of the Louvain partition (with a fixed seed).
+    '''
+    G = csr_graph_view(A, np.arange(A.shape[0]))
+    comm = nx.community.louvain_communities(G, seed=seed)
+    return nx.community.modularity(G, comm)
+
+
+# metrics by name
+metricDict = {'richclub': rich_club,
+              'clustering': avg_clustering,
+              'pathlength': path_length,
+              'modularity': modularity}
+
+
+
+##### batch evaluation of a metric over an ensemble
+def init_worker(ENull, nNodes, func):
+    '''
+    A function to keep the ensemble and the metric in each worker process.
+    '''
+    global ENullWorker, nNodesWorker, funcWorker
+    ENullWorker = ENull
+    nNodesWorker = nNodes
+    funcWorker = func
+
+
+def metric_worker(iNull):
+    '''
+    A function to evaluate the metric on a null network in a worker process.
+    '''
+    return funcWorker(edges_to_csr(ENullWorker[iNull], nNodesWorker))
+
+
+def ensemble_metric(ENull, nNodes, metric, nProc=4):
+    '''
+    A function to evaluate a metric on every null network of an ensemble.
+    input parameters:
+          ENull:    An array of edge arrays, null networks x edges x 2.
+          nNodes:   The number of nodes.
+          metric:   The name of a metric ('richclub', 'clustering',
+                    'pathlength' or 'modularity'), or a function of a
+                    symmetric CSR adjacency matrix.
+          nProc:    The number of worker processes. The default is 4.
+    returns:
+          X:        An array of the metric, one row for each null network.
+    '''
+    func = metricDict[metric] if isinstance(metric, str) else metric
+    if nProc<=1:
+        init_worker(ENull, nNodes, func)
+        return np.array([metric_worker(i) for i in range(len(ENull))])
+    with Pool(nProc, init_worker, (ENull, nNodes, func)) as pool:
+        X = pool.map(metric_worker, range(len(ENull)))
+    return np.array(X)
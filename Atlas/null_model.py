@@ -0,0 +1,334 @@
+#
+# null_model.py
+#
+# degree-preserving random network models by double edge swaps. A network
+# is an array of edges (edges x 2, node indices), and the edge membership
+# test for each candidate swap is a lookup of an integer key in a hashed
+# set, so a swap costs O(1) regardless of the network size. Random numbers
+# are drawn in batches from a seeded generator, and ensembles of null
+# networks are generated across a pool of worker processes, each null
+# network with its own seed derived from the ensemble seed (so the
+# ensemble does not depend on the number of processes). Lattice reference
+# networks (for the small-world index omega) are made by the same swaps,
+# accepting only the swaps that bring the edges closer to the diagonal of
+# the adjacency matrix (i.e., shorter on a ring of the nodes).
+#
+
+import numpy as np
+import networkx as nx
+from scipy import sparse
+from scipy.sparse import csgraph
+from multiprocessing import Pool
+
+
+# the network, shared with the worker processes
+EWorker = None
+nNodesWorker = None
+
+
+##### converters between networkX graphs and edge arrays
+def graph_to_edges(G):
+    '''
+    A function to convert a networkX graph to an edge array.
+    returns:
+          E:        An array of edges (edges x 2) of node indices, the
+                    smaller index first.
+          nodes:    A list of the nodes, in the order of node indices.
+    '''
+    nodes = list(G.nodes())
+    nodeIndex = {x: i for i, x in enumerate(nodes)}
+    E = np.array([[nodeIndex[u], nodeIndex[v]] for u, v in G.edges()
+                  if u!=v], dtype=np.int64).reshape(-1, 2)
+    return np.sort(E, axis=1), nodes
+
+
+def edges_to_graph(E, nodes):
+    '''
+    A function to convert an edge array to a networkX graph.
+    '''
+    nodes = list(nodes)
+    G = nx.Graph()
+    G.add_nodes_from(nodes)
+    G.add_edges_from((nodes[u], nodes[v]) for u, v in E)
+    return G
+
+
+def edges_to_csr(E, nNodes):
+    '''
+    A function to convert an edge array to a symmetric binary CSR
+    adjacency matrix.
+    '''
+    E = np.asarray(E, dtype=np.int64)
+    A = sparse.coo_matrix((np.ones(len(E), dtype=np.int8), (E[:,0], E[:,1])),
+                          shape=(nNodes, nNodes)).tocsr()
+    return A + A.T
+
+
+
+##### the double edge swap
+def edge_key(u, v, nNodes):
+    '''
+    A function to calculate the integer key of an undirected edge.
+    '''
+    return u*nNodes + v if u<v else v*nNodes + u
+
+
+def double_edge_swap(E, nNodes, nSwap, seed=None, maxTries=None,
+                     batchSize=10000):
+    '''
+    A function to randomize a network by degree-preserving double edge
+    swaps. Two edges (a,b) and (c,d) are drawn at random and replaced by
+    (a,c) and (b,d), unless that creates a self-loop or a multi-edge.
+    input parameters:
+          E:         An array of edges (edges x 2), node indices.
+          nNodes:    The number of nodes.
+          nSwap:     The number of swaps.
+          seed:      The random seed (or a numpy Generator). The default is
+                     None, meaning a random seed.
+          maxTries:  The maximum number of attempted swaps. The default is
+                     None, meaning 100 x nSwap.
+          batchSize: The number of random draws made at a time.
+    returns:
+          ERand:     The rewired edge array (a new array).
+    '''
+    rng = np.random.default_rng(seed)
+    if maxTries is None:
+        maxTries = 100*nSwap
+    eu = [int(x) for x in E[:,0]]
+    ev = [int(x) for x in E[:,1]]
+    nEdges = len(eu)
+    if nSwap<=0 or nEdges<2:
+        return np.array(E, dtype=np.int64)
+    edgeSet = set(edge_key(u, v, nNodes) for u, v in zip(eu, ev))
+    nDone = 0
+    nTries = 0
+    while nDone<nSwap:
+        nDraw = min(batchSize, 4*(nSwap-nDone) + 16)
+        listI = rng.integers(0, nEdges, nDraw).tolist()
+        listJ = rng.integers(0, nEdges, nDraw).tolist()
+        listFlip = rng.integers(0, 2, nDraw).tolist()
+        for i, j, flip in zip(listI, listJ, listFlip):
+            nTries += 1
+            if nTries>maxTries:
+                raise RuntimeError('Maximum number of swap attempts (%d) '
+                                   'exceeded' % maxTries)
+            a, b = (eu[i], ev[i]) if flip==0 else (ev[i], eu[i])
+            c, d = eu[j], ev[j]
+            if a==c or a==d or b==c or b==d:
+                continue
+            kAC = edge_key(a, c, nNodes)
+            kBD = edge_key(b, d, nNodes)
+            if kAC in edgeSet or kBD in edgeSet:
+                continue
+            edgeSet.remove(edge_key(a, b, nNodes))
+            edgeSet.remove(edge_key(c, d, nNodes))
+            edgeSet.add(kAC)
+            edgeSet.add(kBD)
+            eu[i], ev[i] = a, c
+            eu[j], ev[j] = b, d
+            nDone += 1
+            if nDone==nSwap:
+                break
+    return np.sort(np.array([eu, ev], dtype=np.int64).T, axis=1)
+
+
+def lattice_edge_swap(E, nNodes, nSwap, seed=None, maxTries=None,
+                      batchSize=10000):
+    '''
+    A function to latticize a network by degree-preserving double edge
+    swaps (as nx.lattice_reference). An edge (a,b) is drawn at random, then
+    an edge (c,d) at a node c near a on the ring of nodes (within the mean
+    degree), and they are replaced by (a,c) and (b,d) unless that creates a
+    self-loop or a multi-edge, or makes the edges longer on the ring. Since
+    the swaps stop being possible as the network approaches a lattice,
+    nSwap is the number of attempted (not made) swaps.
+    input parameters:
+          E:         An array of edges (edges x 2), node indices.
+          nNodes:    The number of nodes.
+          nSwap:     The number of attempted swaps.
+          seed:      The random seed (or a numpy Generator). The default is
+                     None, meaning a random seed.
+          maxTries:  Not used (for the same arguments as double_edge_swap).
+          batchSize: The number of random draws made at a time.
+    returns:
+          ELatt:     The latticized edge array (a new array).
+    '''
+    rng = np.random.default_rng(seed)
+    eu = [int(x) for x in E[:,0]]
+    ev = [int(x) for x in E[:,1]]
+    nEdges = len(eu)
+    if nSwap<=0 or nEdges<2:
+        return np.array(E, dtype=np.int64)
+    edgeSet = set(edge_key(u, v, nNodes) for u, v in zip(eu, ev))
+    # the edges at each node
+    incident = [[] for x in range(nNodes)]
+    for i, (u, v) in enumerate(zip(eu, ev)):
+        incident[u].append(i)
+        incident[v].append(i)
+    # the distances on the ring, by the difference of node indices
+    ringDist = [min(x, nNodes-x) for x in range(nNodes)]
+    maxOffset = max(1, min(int(round(2*nEdges/nNodes)), nNodes//2))
+    nTries = 0
+    while nTries<nSwap:
+        nDraw = min(batchSize, nSwap-nTries)
+        listI = rng.integers(0, nEdges, nDraw).tolist()
+        listFlip = rng.integers(0, 2, nDraw).tolist()
+        listOffset = (rng.integers(1, maxOffset+1, nDraw) *
+                      rng.choice([-1, 1], nDraw)).tolist()
+        listR = rng.random(nDraw).tolist()
+        nTries += nDraw
+        for i, flip, offset, r in zip(listI, listFlip, listOffset, listR):
+            a, b = (eu[i], ev[i]) if flip==0 else (ev[i], eu[i])
+            c = (a + offset) % nNodes
+            if len(incident[c])==0:
+                continue
+            j = incident[c][int(r*len(incident[c]))]
+            d = ev[j] if eu[j]==c else eu[j]
+            if a==c or a==d or b==c or b==d:
+                continue
+            if (ringDist[abs(a-c)] + ringDist[abs(b-d)] >=
+                    ringDist[abs(a-b)] + ringDist[abs(c-d)]):
+                continue
+            kAC = edge_key(a, c, nNodes)
+            kBD = edge_key(b, d, nNodes)
+            if kAC in edgeSet or kBD in edgeSet:
+                continue
+            edgeSet.remove(edge_key(a, b, nNodes))
+            edgeSet.remove(edge_key(c, d, nNodes))
+            edgeSet.add(kAC)
+            edgeSet.add(kBD)
+            eu[i], ev[i] = a, c
+            eu[j], ev[j] = b, d
+            incident[b].remove(i)
+            incident[c].append(i)
+            incident[c].remove(j)
+            incident[b].append(j)
+    return np.sort(np.array([eu, ev], dtype=np.int64).T, axis=1)
+
+
+# swap functions by null model
+swapDict = {'random': double_edge_swap,
+            'lattice': lattice_edge_swap}
+
+
+def is_connected_edges(E, nNodes):
+    '''
+    A function to check if the network of an edge array is connected.
+    '''
+    nComp = csgraph.connected_components(edges_to_csr(E, nNodes),
+                                         directed=False)[0]
+    return nComp==1
+
+
+def connected_double_edge_swap(E, nNodes, nSwap, seed=None, window=None,
+                               model='random'):
+    '''
+    A function to randomize a connected network by double edge swaps (see
+    double_edge_swap) while keeping it connected. Swaps are made in windows,
+    and connectivity is checked at the end of each window: a window that
+    disconnects the network is undone and the window is halved, otherwise
+    the window grows by one (as nx.connected_double_edge_swap).
+    input parameters:
+          E:        An array of edges (edges x 2), node indices.
+          nNodes:   The number of nodes.
+          nSwap:    The number of swaps.
+          seed:     The random seed (or a numpy Generator).
+          window:   The initial window size. The default is None, meaning
+                    the number of edges / 10.
+          model:    'random' (the default) for double_edge_swap, or
+                    'lattice' for lattice_edge_swap.
+    returns:
+          ERand:    The rewired edge array (a new array).
+    '''
+    rng = np.random.default_rng(seed)
+    ERand = np.array(E, dtype=np.int64)
+    if not is_connected_edges(ERand, nNodes):
+        raise ValueError('The network is not connected')
+    if window is None:
+        window = max(1, len(ERand)//10)
+    nDone = 0
+    while nDone<nSwap:
+        nWin = min(window, nSwap-nDone)
+        ETry = swapDict[model](ERand, nNodes, nWin, rng)
+        if is_connected_edges(ETry, nNodes):
+            ERand = ETry
+            nDone += nWin
+            window += 1
+        else:
+            window = max(1, window//2)
+    return ERand
+
+
+
+##### ensembles of null networks
+def init_worker(E, nNodes):
+    '''
+    A function to keep the network in each worker process.
+    '''
+    global EWorker, nNodesWorker
+    EWorker = E
+    nNodesWorker = nNodes
+
+
+def null_worker(args):
+    '''
+    A function to generate a single null network in a worker process.
+    '''
+    nSwap, seed, connected, model = args
+    if connected:
+        return connected_double_edge_swap(EWorker, nNodesWorker, nSwap, seed,
+                                          model=model)
+    return swapDict[model](EWorker, nNodesWorker, nSwap, seed)
+
+
+def null_ensemble(E, nNodes, nNull, nSwap=None, seed=0, connected=False,
+                  nProc=4, iStart=0, model='random'):
+    '''
+    A function to generate an ensemble of degree-preserving null networks.
+    input parameters:
+          E:         An array of edges (edges x 2), node indices.
+          nNodes:    The number of nodes.
+          nNull:     The number of null networks.
+          nSwap:     The number of swaps per null network. The default is
+                     None, meaning 10 x the number of nodes.
+          seed:      The seed of the ensemble. Null network i is generated
+                     with the i-th seed spawned from it.
+          connected: If True, the null networks are kept connected. The
+                     default is False.
+          nProc:     The number of worker processes. The default is 4.
+          iStart:    The index of the first null network, e.g., to extend
+                     an ensemble of iStart null networks. The default is 0.
+          model:     'random' (the default) for random networks, or
+                     'lattice' for lattice reference networks (nSwap is
+                     then the number of attempted swaps).
+    returns:
+          ENull:     An array of edge arrays, null networks x edges x 2.
+    '''
+    E = np.asarray(E, dtype=np.int64)
+    if nSwap is None:
+        nSwap = 10*nNodes
+    listSeed = np.random.SeedSequence(seed).spawn(iStart + nNull)[iStart:]
+    listArgs = [(nSwap, s, connected, model) for s in listSeed]
+    if nProc<=1:
+        init_worker(E, nNodes)
+        listNull = [null_worker(x) for x in listArgs]
+    else:
+        with Pool(nProc, init_worker, (E, nNodes)) as pool:
+            listNull = pool.map(null_worker, listArgs)
+    return np.array(listNull).reshape(nNull, len(E), 2)
+
+
+def rewire_graph(G, nSwap=None, seed=None, connected=False):
+    '''
+    A function to generate a degree-preserving null network of a networkX
+    graph (see double_edge_swap). The default nSwap is 10 x the number of
+    nodes.
+    '''
+    E, nodes = graph_to_edges(G)
+    if nSwap is None:
+        nSwap = 10*len(nodes)
+    if connected:
+        ERand = connected_double_edge_swap(E, len(nodes), nSwap, seed)
+    else:
+        ERand = double_edge_swap(E, len(nodes), nSwap, seed)
+    return edges_to_graph(ERand, nodes)
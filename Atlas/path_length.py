@@ -0,0 +1,192 @@
+#
+# path_length.py
+#
+# the characteristic path length (average shortest path length) of large,
+# binary, undirected networks given as sparse adjacency matrices. The giant
+# component is found first (csgraph.connected_components), and then a
+# block of source nodes is searched at a time by a level-synchronous
+# breadth-first search: each BFS level of all the sources in the block is
+# one compiled sparse x dense matrix product. Blocks are spread across a
+# pool of worker processes. A sampled-sources estimator, with a bound on
+# its error, is included for quick screening of voxel-scale networks.
+#
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+from multiprocessing import Pool
+
+
+# the adjacency matrix, shared with the worker processes
+AWorker = None
+
+
+##### the giant component
+def giant_component(A):
+    '''
+    A function to find the giant (largest connected) component.
+    input parameters:
+          A:        A symmetric sparse adjacency matrix.
+    returns:
+          GCInd:    The indices of the nodes in the giant component.
+          ccSize:   The sizes of all the connected components, largest
+                    first.
+    '''
+    nComp, labels = csgraph.connected_components(A, directed=False)
+    compSize = np.bincount(labels)
+    GCInd = np.nonzero(labels==np.argmax(compSize))[0]
+    return GCInd, np.sort(compSize)[::-1]
+
+
+
+##### breadth-first search from a block of sources
+def bfs_block(A, sources):
+    '''
+    A function to run breadth-first searches from a block of source nodes
+    at once, one BFS level per sparse matrix product.
+    input parameters:
+          A:        A symmetric sparse CSR adjacency matrix, with an integer
+                    data type wide enough for the node degrees (e.g., int16).
+          sources:  A list of source nodes.
+    returns:
+          dSum:     A vector of the sums of the path lengths from each
+                    source to the nodes it reaches.
+          nReach:   A vector of the number of nodes reached from each source
+                    (the source itself excluded).
+          ecc:      A vector of the eccentricity of each source (the largest
+                    path length from it).
+    '''
+    nSrc = len(sources)
+    front = np.zeros((A.shape[0], nSrc), dtype=A.dtype)
+    front[sources, np.arange(nSrc)] = 1
+    reach = front>0
+    dSum = np.zeros(nSrc, dtype=np.int64)
+    nReach = np.zeros(nSrc, dtype=np.int64)
+    ecc = np.zeros(nSrc, dtype=np.int64)
+    d = 0
+    while True:
+        d += 1
+        newFront = (A.dot(front)>0) & ~reach
+        nNew = np.count_nonzero(newFront, axis=0)
+        if nNew.sum()==0:
+            break
+        dSum += d*nNew
+        nReach += nNew
+        ecc[nNew>0] = d
+        reach |= newFront
+        front = newFront.astype(A.dtype)
+    return dSum, nReach, ecc
+
+
+def bfs_adj(A):
+    '''
+    A function to prepare an adjacency matrix for bfs_block: CSR, binary,
+    in the narrowest integer type that cannot overflow in the products.
+    '''
+    A = sparse.csr_matrix(A)
+    A = (A!=0).astype(np.int16)
+    degMax = np.diff(A.indptr).max() if A.shape[0]>0 else 0
+    if degMax>np.iinfo(np.int16).max:
+        A = A.astype(np.int32)
+    return A
+
+
+def init_worker(A):
+    '''
+    A function to keep the adjacency matrix in each worker process.
+    '''
+    global AWorker
+    AWorker = A
+
+
+def bfs_worker(sources):
+    '''
+    A function to run bfs_block in a worker process.
+    '''
+    return bfs_block(AWorker, sources)
+
+
+def bfs_sources(A, sources, nProc=1, blockSize=256):
+    '''
+    A function to run bfs_block over many sources, a block of blockSize
+    sources at a time, blocks across nProc worker processes.
+    '''
+    listBlocks = [sources[i:(i+blockSize)]
+                  for i in range(0, len(sources), blockSize)]
+    if nProc<=1:
+        listOut = [bfs_block(A, x) for x in listBlocks]
+    else:
+        with Pool(nProc, init_worker, (A,)) as pool:
+            listOut = pool.map(bfs_worker, listBlocks)
+    return tuple(np.hstack([x[i] for x in listOut]) for i in range(3))
+
+
+
+##### characteristic path length
+def char_path_length(A, giant=True, nProc=1, blockSize=256):
+    '''
+    A function to calculate the exact characteristic path length, i.e.,
+    the average shortest path length over all pairs of nodes (as in
+    nx.average_shortest_path_length).
+    input parameters:
+          A:          A symmetric sparse adjacency matrix.
+          giant:      If True (the default), the path length of the giant
+                      component. Otherwise the network has to be connected.
+          nProc:      The number of worker processes. The default is 1.
+          blockSize:  The number of sources searched at a time.
+    returns:
+          L:          The characteristic path length.
+          GCInd:      The indices of the nodes in the giant component.
+    '''
+    GCInd, ccSize = giant_component(A)
+    if not giant and len(ccSize)>1:
+        raise ValueError('The network is not connected')
+    A = bfs_adj(A)[GCInd][:,GCInd]
+    NNodes = len(GCInd)
+    if NNodes<2:
+        return 0, GCInd
+    dSum, nReach, ecc = bfs_sources(A, np.arange(NNodes), nProc, blockSize)
+    return dSum.sum() / (NNodes*(NNodes-1.0)), GCInd
+
+
+def char_path_length_sampled(A, nSample=1000, delta=0.05, seed=0, nProc=1,
+                             blockSize=256):
+    '''
+    A function to estimate the characteristic path length of the giant
+    component from the shortest path lengths of a random sample of source
+    nodes (to all the nodes).
+    The estimate is the mean of the average path lengths from the sampled
+    sources. Each of them is between 1 and the diameter, which is at most
+    twice the smallest eccentricity of the sources, so by the Hoeffding-
+    Serfling inequality (sampling without replacement), the exact value is
+    within +/- halfWidth of the estimate with probability at least 1-delta.
+    input parameters:
+          A:          A symmetric sparse adjacency matrix.
+          nSample:    The number of source nodes. The default is 1000. If
+                      the giant component has no more nodes, L is exact.
+          delta:      The error probability of the bound. The default is
+                      0.05.
+          seed:       The random seed for sampling the sources.
+          nProc:      The number of worker processes. The default is 1.
+          blockSize:  The number of sources searched at a time.
+    returns:
+          L:          The estimated characteristic path length.
+          halfWidth:  The half width of the 1-delta error bound (0 if exact).
+          GCInd:      The indices of the nodes in the giant component.
+    '''
+    GCInd, ccSize = giant_component(A)
+    A = bfs_adj(A)[GCInd][:,GCInd]
+    NNodes = len(GCInd)
+    if NNodes<2:
+        return 0, 0, GCInd
+    nSample = min(nSample, NNodes)
+    rng = np.random.default_rng(seed)
+    sources = np.sort(rng.choice(NNodes, nSample, replace=False))
+    dSum, nReach, ecc = bfs_sources(A, sources, nProc, blockSize)
+    L = np.mean(dSum / (NNodes-1.0))
+    if nSample==NNodes:
+        return L, 0, GCInd
+    R = 2*ecc.min() - 1.0  # the range of the average path length
+    halfWidth = R * np.sqrt((1 - (nSample-1.0)/NNodes) *
+                            np.log(2/delta) / (2*nSample))
+    return L, halfWidth, GCInd
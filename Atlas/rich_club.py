@@ -0,0 +1,111 @@
+#
+# rich_club.py
+#
+# the rich club coefficient phi(k) at every degree level k at once. The
+# number of nodes with degree > k and the number of edges between them
+# (the edges whose smaller endpoint degree is > k) are cumulative counts
+# over the degree sequence and the edge endpoint degrees, so phi(k) for
+# all k costs O(N + E). A stack of null networks is done in the same way,
+# all of them at once, and every result is on a fixed grid of k, so the
+# original and the null networks always line up.
+#
+
+import warnings
+import numpy as np
+from scipy import sparse
+
+
+##### rich club coefficients of a stack of networks
+def rich_club_stack(EStack, nNodes, kGrid=None):
+    '''
+    A function to calculate the (unnormalized) rich club coefficient of a
+    stack of networks with the same number of nodes and edges, e.g., an
+    ensemble of degree-preserving null networks.
+    input parameters:
+          EStack:   An array of edge arrays, networks x edges x 2 (node
+                    indices), or a single edge array (edges x 2).
+          nNodes:   The number of nodes.
+          kGrid:    The degree levels k. The default is None, meaning
+                    0, ..., max degree - 1 (of the first network).
+    returns:
+          kGrid:    The degree levels k.
+          phi:      An array of rich club coefficients, networks x kGrid (a
+                    vector for a single edge array). phi is nan where fewer
+                    than 2 nodes have degree > k.
+    '''
+    EStack = np.asarray(EStack, dtype=np.int64)
+    single = EStack.ndim==2
+    if single:
+        EStack = EStack[np.newaxis]
+    nNet = EStack.shape[0]
+    # degrees of all the networks, by a single bincount with offsets
+    offset = (np.arange(nNet) * nNodes)[:,np.newaxis,np.newaxis]
+    deg = np.bincount((EStack + offset).ravel(),
+                      minlength=nNet*nNodes).reshape(nNet, nNodes)
+    if kGrid is None:
+        kGrid = np.arange(deg[0].max())
+    kGrid = np.asarray(kGrid, dtype=np.int64)
+    kMax = max(deg.max(), kGrid.max() if len(kGrid)>0 else 0) + 1
+    # the smaller endpoint degree of each edge
+    iNet = np.arange(nNet)[:,np.newaxis]
+    degMin = np.minimum(deg[iNet, EStack[:,:,0]], deg[iNet, EStack[:,:,1]])
+    # nodes with degree > k, and edges among them, for all k
+    kOffset = (np.arange(nNet) * kMax)[:,np.newaxis]
+    nodeHist = np.bincount((deg + kOffset).ravel(),
+                           minlength=nNet*kMax).reshape(nNet, kMax)
+    edgeHist = np.bincount((degMin + kOffset).ravel(),
+                           minlength=nNet*kMax).reshape(nNet, kMax)
+    nk = nNodes - np.cumsum(nodeHist, axis=1)
+    ek = EStack.shape[1] - np.cumsum(edgeHist, axis=1)
+    kInd = np.clip(kGrid, 0, kMax-1)
+    nk = nk[:,kInd].astype(np.float64)
+    ek = ek[:,kInd].astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        phi = np.where(nk>1, 2*ek / (nk*(nk-1)), np.nan)
+    return kGrid, (phi[0] if single else phi)
+
+
+def rich_club_csr(A, kGrid=None):
+    '''
+    A function to calculate the (unnormalized) rich club coefficient of a
+    network given as a symmetric sparse adjacency matrix (see
+    rich_club_stack).
+    '''
+    trI, trJ = sparse.triu(A, 1).nonzero()
+    return rich_club_stack(np.vstack((trI, trJ)).T, A.shape[0], kGrid)
+
+
+
+##### normalized rich club coefficient
+def rich_club_norm(E, nNodes, ENull, kGrid=None, alpha=0.05):
+    '''
+    A function to calculate the rich club coefficient of a network, and
+    normalize it by an ensemble of null networks, in one call.
+    input parameters:
+          E:        The edge array of the network (edges x 2).
+          nNodes:   The number of nodes.
+          ENull:    An array of edge arrays of the null networks, null
+                    networks x edges x 2 (e.g., from cached_null_ensemble).
+          kGrid:    The degree levels k. The default is None, meaning
+                    0, ..., max degree - 1 of the network.
+          alpha:    The confidence bands cover 1-alpha of the null
+                    networks. The default is 0.05.
+    returns:
+          kGrid:    The degree levels k.
+          phi:      The rich club coefficient of the network.
+          phiNull:  The mean rich club coefficient of the null networks.
+          phiNorm:  The normalized rich club coefficient, phi / phiNull.
+          bandNorm: The confidence band of the null networks, normalized
+                    the same way (2 x kGrid, lower and upper). phiNorm
+                    above the upper band indicates a rich club.
+    '''
+    kGrid, phi = rich_club_stack(E, nNodes, kGrid)
+    kGrid, phiStack = rich_club_stack(ENull, nNodes, kGrid)
+    # (k levels with no defined phi in any null network stay nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        phiNull = np.nanmean(phiStack, axis=0)
+        phiNorm = phi / phiNull
+        bandNorm = np.nanpercentile(phiStack, [100*alpha/2, 100*(1-alpha/2)],
+                                    axis=0) / phiNull
+    return kGrid, phi, phiNull, phiNorm, bandNorm
@@ -0,0 +1,334 @@
+#
+# roi_extract.py
+#
+# extracts mean ROI time series from 4D fMRI data. The atlas is turned
+# into a voxel -> label index once, and all ROIs at all time points are
+# averaged together with a single sparse grouped mean. The fMRI data can
+# be an array or a NIfTI file; files are streamed in chunks of time points.
+#
+
+import numpy as np
+from scipy import sparse
+from fmri_stream import iter_fmri_chunks
+
+
+##### function to build the voxel -> label index of an atlas
+def roi_label_index(dataAtlas):
+    '''
+    A function to build the voxel-to-label index of an atlas image, so
+    that the atlas only has to be scanned once.
+    input parameters:
+          dataAtlas:The 3D array of the atlas image defining different ROIs.
+    returns:
+          indVox:   A tuple of voxel indices (as returned by np.nonzero) of
+                    the voxels belonging to one of the ROIs.
+          indLabel: A vector of column indices into roi_ind, one for each
+                    voxel in indVox.
+          roi_ind:  A vector of ROI numbers, from the smallest to the largest
+                    ROI number in the atlas (same as in extract_roits).
+    '''
+
+    # voxels with a positive label
+    indVox = np.nonzero(dataAtlas>0)
+    labVox = dataAtlas[indVox]
+
+    # creating the roi indices
+    roiMin = np.min(labVox)
+    roiMax = np.max(labVox)
+    roi_ind = np.arange(roiMin, roiMax+1)
+
+    # column index of each voxel -- voxels whose label does not exactly
+    # match one of roi_ind are not part of any ROI
+    posVox = labVox - roiMin
+    indLabel = np.rint(posVox).astype(np.intp)
+    keepVox = (posVox==indLabel)
+    indVox = tuple(x[keepVox] for x in indVox)
+    indLabel = indLabel[keepVox]
+
+    # returning the index
+    return indVox, indLabel, roi_ind
+
+
+
+##### function to average voxel time series within ROIs
+def roi_grouped_mean(Y, indLabel, nROI, indRow=None):
+    '''
+    A function to calculate the nan-aware mean of voxel time series within
+    each ROI. Voxels with value zero or nan do not contribute to the mean.
+    input parameters:
+          Y:        A voxel x time array of fMRI data.
+          indLabel: A vector of ROI column indices.
+          nROI:     The number of ROIs (columns of the output).
+          indRow:   A vector of rows of Y, one for each element of indLabel.
+                    The default is None, meaning row i of Y belongs to ROI
+                    indLabel[i]. With indRow, the same voxel can belong to
+                    ROIs of several atlases.
+    returns:
+          roi_ts:   A time x ROI array of mean time series. A time point
+                    without any valid voxel in an ROI is set to zero.
+    '''
+
+    # sparse ROI x voxel indicator matrix
+    if indRow is None:
+        indRow = np.arange(len(indLabel))
+    S = sparse.csr_matrix((np.ones(len(indLabel)), (indLabel, indRow)),
+                          shape=(nROI, Y.shape[0]))
+    # valid voxel values (zero or nan excluded)
+    validY = np.isfinite(Y) & (Y!=0)
+    sumY = S.dot(np.where(validY, Y, 0)).T
+    nY = S.dot(validY.astype(np.float64)).T
+    # the mean, zero where there is no valid voxel
+    roi_ts = np.zeros(sumY.shape)
+    np.divide(sumY, nY, out=roi_ts, where=nY>0)
+    return roi_ts
+
+
+
+##### function to calculate ROI means, one chunk of time points at a time
+def roi_mean_chunks(datafMRI, indVox, indLabel, nROI, indRow=None,
+                    chunkMB=256):
+    '''
+    A function to calculate the mean ROI time series (as in
+    roi_grouped_mean), reading the fMRI data in chunks of time points so
+    that only the voxels in indVox of a single chunk are in memory.
+    input parameters:
+          datafMRI: The 4D array of the fMRI image, a NIfTI file name, or a
+                    nibabel image.
+          indVox:   A tuple of voxel indices of the voxels to be read.
+          indLabel, nROI, indRow:
+                    As in roi_grouped_mean, with rows referring to indVox.
+          chunkMB:  The memory budget for a chunk of fMRI data, in
+                    megabytes. The default is 256.
+    returns:
+          roi_ts:   A time x ROI array of mean time series.
+    '''
+    tsList = []
+    for tStart, tEnd, X in iter_fmri_chunks(datafMRI, chunkMB):
+        Y = np.asarray(X[indVox], dtype=np.float64)
+        tsList.append(roi_grouped_mean(Y, indLabel, nROI, indRow))
+    return np.vstack(tsList)
+
+
+
+##### function to remove ROIs without any signal
+def remove_empty_roi(roi_ts, roi_ind):
+    '''
+    A function to remove columns of roi_ts which are zero at all time
+    points, together with the corresponding ROI numbers.
+    '''
+    keepInd = np.any(roi_ts!=0, axis=0)
+    return roi_ts[:,keepInd], roi_ind[keepInd]
+
+
+
+##### function to extract mean fMRI time series from ROIs
+def extract_roits(datafMRI, dataAtlas, chunkMB=256):
+    '''
+    A function to extract the average ROI time series from 4D fMRI
+    data.
+    input parameters:
+          datafMRI: The 4D array of the fMRI image, or the NIfTI file name
+                    (or nibabel image) of it. The fMRI data should have
+                    already been normalized and preprocessed. Voxels with
+                    value zero are treated as missing. The data are read in
+                    chunks of time points and are not modified.
+          dataAtlas:The 3D array of the atlas image defining different ROIs.
+                    The atlas image is assumed to be in the same space as the
+                    fMRI data. In other words, it needs to be re-sliced to
+                    the fMRI data voxel size beforehand.
+          chunkMB:  The memory budget for a chunk of fMRI data, in
+                    megabytes. The default is 256.
+    returns:
+          roi_ts:   An array of the extracted time series. Rows correspond to
+                    time points, the columns corresponds to ROIs. The ROIs are
+                    in the same order as roi_ind.
+          roi_ind:  A vector of ROI numbers, in the same order as the columns
+                    of the roi_ts.
+    '''
+
+    # voxel -> label index, built once
+    indVox, indLabel, roi_ind = roi_label_index(dataAtlas)
+
+    # grouped mean of the voxels within the atlas, chunk by chunk
+    roi_ts = roi_mean_chunks(datafMRI, indVox, indLabel, len(roi_ind),
+                             chunkMB=chunkMB)
+
+    # removing ROIs without any signal, then returning the results
+    return remove_empty_roi(roi_ts, roi_ind)
+
+
+##### function to calculate ROI geometry from the label index
+def roi_geometry_index(indVox, indLabel, nROI):
+    '''
+    A function to calculate the centroid, the number of voxels and the
+    bounding box of every ROI, in one pass over the label index.
+    input parameters:
+          indVox, indLabel:
+                    The voxel -> label index from roi_label_index.
+          nROI:     The number of ROIs (length of roi_ind).
+    returns:
+          xyz:      An nROI x 3 array of ROI centroids (in voxel
+                    coordinates). ROIs without voxels are nan.
+          nVox:     A vector of the number of voxels in each ROI.
+          bbox:     An nROI x 6 array of bounding boxes, (xmin, ymin, zmin,
+                    xmax, ymax, zmax) in voxel coordinates. ROIs without
+                    voxels are -1.
+    '''
+    nVox = np.bincount(indLabel, minlength=nROI)
+    xyz = np.full((nROI, 3), np.nan)
+    bbox = np.full((nROI, 6), -1, dtype=np.intp)
+    bboxMin = np.full((nROI, 3), np.iinfo(np.intp).max, dtype=np.intp)
+    bboxMax = np.full((nROI, 3), -1, dtype=np.intp)
+    for iDim in range(3):
+        sumX = np.bincount(indLabel, weights=indVox[iDim], minlength=nROI)
+        np.divide(sumX, nVox, out=xyz[:,iDim], where=nVox>0)
+        np.minimum.at(bboxMin[:,iDim], indLabel, indVox[iDim])
+        np.maximum.at(bboxMax[:,iDim], indLabel, indVox[iDim])
+    bbox[nVox>0,:3] = bboxMin[nVox>0]
+    bbox[nVox>0,3:] = bboxMax[nVox>0]
+    return xyz, nVox, bbox
+
+
+def roi_geometry(dataAtlas):
+    '''
+    A function to calculate the geometry of all ROIs in an atlas image.
+    input parameters:
+          dataAtlas:The 3D array of the atlas image.
+    returns:
+          roi_ind:  A vector of ROI numbers (as in roi_label_index).
+          xyz, nVox, bbox:
+                    The ROI centroids, voxel counts and bounding boxes, in
+                    the same order as roi_ind (see roi_geometry_index).
+    '''
+    indVox, indLabel, roi_ind = roi_label_index(dataAtlas)
+    xyz, nVox, bbox = roi_geometry_index(indVox, indLabel, len(roi_ind))
+    return roi_ind, xyz, nVox, bbox
+
+
+
+###### function to extract mean ROI coordinates for future plotting
+def roi_coord(dataAtlas, nodeList):
+    '''
+    A function to calculate the centroids (mean voxel coordinates) of the
+    ROIs in nodeList. Nodes not found in the atlas are nan.
+    '''
+    roi_ind, xyz, nVox, bbox = roi_geometry(dataAtlas)
+    return select_roi(roi_ind, xyz, nodeList)
+
+
+def select_roi(roi_ind, X, nodeList):
+    '''
+    A function to pick the rows of X (ordered as roi_ind) corresponding to
+    the ROIs in nodeList. Nodes not in roi_ind are nan.
+    '''
+    nodeList = np.asarray(nodeList)
+    posNode = np.rint(nodeList - roi_ind[0]).astype(np.intp)
+    inAtlas = (posNode>=0) & (posNode<len(roi_ind))
+    inAtlas[inAtlas] = (roi_ind[posNode[inAtlas]]==nodeList[inAtlas])
+    Xnode = np.full((len(nodeList),) + X.shape[1:], np.nan)
+    Xnode[inAtlas] = X[posNode[inAtlas]]
+    return Xnode
+
+
+
+##### function to extract ROI time series for many atlases at once
+def extract_roits_multi(datafMRI, dataAtlas4D, listInd=None, chunkMB=256):
+    '''
+    A function to extract the average ROI time series for several atlases
+    (e.g., all K levels of the Rt2 atlas) with a single read of the 4D fMRI
+    data. Each atlas gives the same results as extract_roits and roi_coord.
+    input parameters:
+          datafMRI:    The 4D array of the fMRI image, or the NIfTI file
+                       name (or nibabel image) of it.
+          dataAtlas4D: The 4D array of the atlas images. Each 3D volume
+                       along the last axis is a separate atlas.
+          listInd:     A list of volumes of dataAtlas4D to be used. The
+                       default is None, meaning all the volumes.
+          chunkMB:     The memory budget for a chunk of fMRI data, in
+                       megabytes. The default is 256.
+    returns:
+          tsList:      A list of roi_ts arrays, one for each atlas.
+          nodeList:    A list of roi_ind vectors, one for each atlas.
+          xyzList:     A list of ROI centroid coordinates, one for each atlas.
+    '''
+
+    if listInd is None:
+        listInd = range(dataAtlas4D.shape[-1])
+
+    # label index of each atlas
+    indexList = [roi_label_index(dataAtlas4D[:,:,:,i]) for i in listInd]
+
+    # union of labeled voxels across atlases -> row of the voxel data
+    maskAll = np.zeros(dataAtlas4D.shape[:3], dtype=bool)
+    for indVox, indLabel, roi_ind in indexList:
+        maskAll[indVox] = True
+    indVoxAll = np.nonzero(maskAll)
+    rowMap = np.zeros(dataAtlas4D.shape[:3], dtype=np.intp)
+    rowMap[indVoxAll] = np.arange(len(indVoxAll[0]))
+
+    # stacking all atlases as one set of ROI columns
+    offset = np.cumsum([0] + [len(x[2]) for x in indexList])
+    indLabelAll = np.hstack([x[1] + offset[i]
+                             for i,x in enumerate(indexList)])
+    indRowAll = np.hstack([rowMap[x[0]] for x in indexList])
+
+    # the fMRI data is read only once, for all atlases
+    tsAll = roi_mean_chunks(datafMRI, indVoxAll, indLabelAll, offset[-1],
+                            indRowAll, chunkMB)
+
+    # splitting into atlases, removing ROIs without any signal
+    tsList = []
+    nodeList = []
+    xyzList = []
+    for i,(indVox, indLabel, roi_ind) in enumerate(indexList):
+        roi_ts = tsAll[:,offset[i]:offset[i+1]]
+        keepInd = np.any(roi_ts!=0, axis=0)
+        tsList.append(roi_ts[:,keepInd])
+        nodeList.append(roi_ind[keepInd])
+        xyz, nVox, bbox = roi_geometry_index(indVox, indLabel, len(roi_ind))
+        xyzList.append(xyz[keepInd])
+
+    return tsList, nodeList, xyzList
+
+
+
+##### functions to save / load multi-atlas time series in a single file
+def save_roits_multi(fOut, K, tsList, nodeList, xyzList):
+    '''
+    A function to write the ROI time series of several atlases into a
+    single .npz file.
+    input parameters:
+          fOut:     The output file name.
+          K:        A list of atlas labels (e.g., K of the Rt2 atlas), one for
+                    each element of tsList.
+          tsList, nodeList, xyzList:
+                    The outputs from extract_roits_multi.
+    '''
+    nROI = [len(x) for x in nodeList]
+    np.savez(fOut,
+             K = np.array(K),
+             nROI = np.array(nROI),
+             ts = np.hstack(tsList),
+             nodes = np.hstack(nodeList),
+             xyz = np.vstack(xyzList))
+
+
+def load_roits_multi(fIn, targetK):
+    '''
+    A function to read the ROI time series of one atlas from a file
+    written by save_roits_multi.
+    input parameters:
+          fIn:      The file name.
+          targetK:  The atlas label (e.g., K of the Rt2 atlas).
+    returns:
+          ts, nodes, xyz:  The time series, ROI numbers and ROI centroids of
+                    the atlas, as in the single-atlas .npz files.
+    '''
+    infile = np.load(fIn)
+    K = list(infile['K'])
+    offset = np.cumsum([0] + list(infile['nROI']))
+    i = K.index(targetK)
+    ts = infile['ts'][:,offset[i]:offset[i+1]]
+    nodes = infile['nodes'][offset[i]:offset[i+1]]
+    xyz = infile['xyz'][offset[i]:offset[i+1]]
+    return ts, nodes, xyz
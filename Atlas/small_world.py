@@ -0,0 +1,163 @@
+#
+# small_world.py
+#
+# small-world indices of many networks (e.g., atlas K levels x subjects)
+# in one batch. For each network, the clustering coefficient C (one sparse
+# triangle count, see net_clustering.py) and the characteristic path
+# length L (one BFS sweep of the giant component, see path_length.py) are
+# calculated together, and so are those of its matched references: random
+# networks and lattice networks with the same degree sequence, from the
+# null ensemble cache (see null_cache.py). Then
+#       sigma = (C / Cr) / (L / Lr)       (as nx.sigma)
+#       omega = Lr / L - C / Cl           (as nx.omega)
+# where Cr, Lr are the means over the random networks, and Cl the mean over
+# the lattice networks. Each network is loaded once, and networks are
+# spread across a pool of worker processes. The results are a tidy table,
+# one row per network.
+#
+
+import os
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from multiprocessing import Pool
+from graph_store import load_graph, read_adjlist_csr
+from null_cache import cached_null_ensemble
+from null_model import edges_to_csr
+from net_clustering import clustering
+from path_length import char_path_length
+
+
+# the parameters, shared with the worker processes
+paramWorker = None
+
+
+##### network loading
+def load_csr(fNet, nodetype=int):
+    '''
+    A function to load a network as a symmetric binary CSR adjacency
+    matrix, from an .adjlist file or a graph directory (see graph_store).
+    '''
+    if os.path.isdir(fNet):
+        A = load_graph(fNet)[0]
+    else:
+        A = read_adjlist_csr(fNet, nodetype)[0]
+    return (sparse.csr_matrix(A)!=0).astype(np.int8)
+
+
+
+##### C and L of a network
+def c_and_l(A):
+    '''
+    A function to calculate the average clustering coefficient and the
+    characteristic path length (of the giant component) of a network.
+    returns:
+          C:        The average clustering coefficient.
+          L:        The characteristic path length.
+          nGC:      The number of nodes in the giant component.
+    '''
+    Ci, C, T = clustering(A)
+    L, GCInd = char_path_length(A)
+    return C, L, len(GCInd)
+
+
+def reference_c_and_l(E, nNodes, nRef, model, seed, cacheDir):
+    '''
+    A function to calculate the mean C and L over an ensemble of reference
+    networks ('random' or 'lattice'), taken from the null ensemble cache.
+    '''
+    nEdges = len(E)
+    nSwap = 10*nNodes if model=='random' else 50*nEdges
+    ERef = cached_null_ensemble(E, nNodes, nRef, nSwap, seed,
+                                cacheDir=cacheDir, nProc=1, model=model)
+    CL = np.array([c_and_l(edges_to_csr(x, nNodes))[:2] for x in ERef])
+    return CL.mean(axis=0)
+
+
+
+##### small-world indices
+def small_world(A, nRef=10, seed=0, cacheDir='NullCache'):
+    '''
+    A function to calculate the small-world indices of a network.
+    input parameters:
+          A:        A symmetric sparse adjacency matrix.
+          nRef:     The number of random and lattice reference networks.
+                    The default is 10.
+          seed:     The seed of the reference ensembles.
+          cacheDir: The null ensemble cache directory. The default is
+                    'NullCache'.
+    returns:
+          dictSW:   A dictionary of the number of nodes and edges, the
+                    size of the giant component, C, L, Cr, Lr, Cl, Ll,
+                    sigma and omega.
+    '''
+    A = (sparse.csr_matrix(A)!=0).astype(np.int8)
+    nNodes = A.shape[0]
+    trI, trJ = sparse.triu(A, 1).nonzero()
+    E = np.vstack((trI, trJ)).T
+    C, L, nGC = c_and_l(A)
+    Cr, Lr = reference_c_and_l(E, nNodes, nRef, 'random', seed, cacheDir)
+    Cl, Ll = reference_c_and_l(E, nNodes, nRef, 'lattice', seed, cacheDir)
+    sigma = (C/Cr) / (L/Lr) if Cr>0 and Lr>0 and L>0 else np.nan
+    omega = Lr/L - C/Cl if L>0 and Cl>0 else np.nan
+    return {'nNodes': nNodes, 'nEdges': len(E), 'nGC': nGC,
+            'C': C, 'L': L, 'Cr': Cr, 'Lr': Lr, 'Cl': Cl, 'Ll': Ll,
+            'sigma': sigma, 'omega': omega}
+
+
+def init_worker(param):
+    '''
+    A function to keep the parameters in each worker process.
+    '''
+    global paramWorker
+    paramWorker = param
+
+
+def small_world_worker(fNet):
+    '''
+    A function to load a network and calculate its small-world indices in
+    a worker process.
+    '''
+    nRef, seed, cacheDir, nodetype = paramWorker
+    return small_world(load_csr(fNet, nodetype), nRef, seed, cacheDir)
+
+
+def small_world_batch(listNet, listInfo=None, nRef=10, seed=0,
+                      cacheDir='NullCache', nodetype=int, nProc=4):
+    '''
+    A function to calculate the small-world indices of many networks,
+    networks across worker processes.
+    input parameters:
+          listNet:  A list of network files (.adjlist files or graph
+                    directories).
+          listInfo: A list of dictionaries, one for each network, of
+                    columns to add to the table (e.g., {'subject': ...,
+                    'K': ...}). The default is None (no extra columns).
+          nRef:     The number of random and lattice reference networks.
+                    The default is 10.
+          seed:     The seed of the reference ensembles.
+          cacheDir: The null ensemble cache directory. The default is
+                    'NullCache'.
+          nodetype: The type of the node IDs in .adjlist files.
+          nProc:    The number of worker processes. The default is 4.
+    returns:
+          dfSW:     A data frame, one row for each network, with the
+                    columns of listInfo, the network file, and the columns
+                    of small_world.
+    '''
+    param = (nRef, seed, cacheDir, nodetype)
+    if nProc<=1:
+        init_worker(param)
+        listSW = [small_world_worker(x) for x in listNet]
+    else:
+        with Pool(nProc, init_worker, (param,)) as pool:
+            listSW = pool.map(small_world_worker, listNet, chunksize=1)
+    if listInfo is None:
+        listInfo = [{} for x in listNet]
+    listRows = []
+    for info, fNet, dictSW in zip(listInfo, listNet, listSW):
+        row = dict(info)
+        row['network'] = fNet
+        row.update(dictSW)
+        listRows.append(row)
+    return pd.DataFrame(listRows)
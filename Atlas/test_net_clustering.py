@@ -0,0 +1,52 @@
+#
+# test_net_clustering.py
+#
+# checks of net_clustering.py against networkX, including networks with
+# self-loops and explicitly stored zeros in the adjacency matrix.
+#
+
+import numpy as np
+import networkx as nx
+from scipy import sparse
+from net_clustering import clustering, clustering_batch
+
+
+def adj_with_loop_and_zero(G):
+    '''
+    The adjacency matrix of G, with a self-loop on node 0 and an explicitly
+    stored zero between two non-adjacent nodes.
+    '''
+    i, j = next((u, v) for u in G for v in G if u<v and not G.has_edge(u, v))
+    listI = [u for u, v in G.edges()] + [v for u, v in G.edges()] + [0, i, j]
+    listJ = [v for u, v in G.edges()] + [u for u, v in G.edges()] + [0, j, i]
+    data = [1.0]*(2*G.number_of_edges()) + [1.0, 0.0, 0.0]
+    N = G.number_of_nodes()
+    return sparse.csr_matrix((data, (listI, listJ)), shape=(N, N))
+
+
+def test_clustering_matches_networkx():
+    G = nx.connected_watts_strogatz_graph(100, 6, 0.2, seed=1)
+    Ci, C, T = clustering(nx.to_scipy_sparse_array(G, format='csr'))
+    CiNx = nx.clustering(G)
+    assert np.allclose(Ci, [CiNx[x] for x in G])
+    assert np.isclose(C, nx.average_clustering(G))
+    assert np.isclose(T, nx.transitivity(G))
+
+
+def test_clustering_self_loop_and_stored_zero():
+    G = nx.connected_watts_strogatz_graph(100, 6, 0.2, seed=1)
+    A = adj_with_loop_and_zero(G)
+    assert A.diagonal()[0]!=0 and (A.data==0).sum()>0
+    Ci, C, T = clustering(A)
+    CiNx = nx.clustering(G)
+    assert np.allclose(Ci, [CiNx[x] for x in G])
+    assert np.isclose(C, nx.average_clustering(G))
+    assert np.isclose(T, nx.transitivity(G))
+
+
+def test_clustering_batch():
+    listG = [nx.gnm_random_graph(60, 200, seed=s) for s in range(3)]
+    listA = [nx.to_scipy_sparse_array(G, format='csr') for G in listG]
+    CiList, C, T = clustering_batch(listA)
+    assert np.allclose(C, [nx.average_clustering(G) for G in listG])
+    assert np.allclose(T, [nx.transitivity(G) for G in listG])
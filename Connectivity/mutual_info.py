@@ -1,5 +1,6 @@
 import os
 import numpy as np
+from multiprocessing import Pool
 
 def mutual_information(X, bins):
     A = np.zeros([X.shape[1], X.shape[1]])
@@ -33,3 +34,123 @@ def shan_entropy(c):
     return H
 
 
+
+
+##### vectorized all-pairs mutual information
+# Each column is discretized once (same bins as np.histogram(x, bins)), the
+# marginal entropies are computed once, and the joint histograms of a row
+# against all the following columns come from a single bincount of the
+# combined bin indices. Blocks of rows can run on several processes.
+
+# the discretized data and the marginal entropies, shared with the worker
+# processes
+BWorker = None
+HWorker = None
+binsWorker = None
+
+def discretize(X, bins):
+    '''
+    A function to discretize each column of a data matrix into equal-width
+    bins, the same bins as np.histogram(x, bins).
+    input parameters:
+          X:        The data matrix (observations x variables).
+          bins:     The number of bins.
+    returns:
+          B:        The bin index (0, ..., bins-1) of every element.
+    '''
+    X = np.asarray(X, dtype=float)
+    B = np.zeros(X.shape, dtype=np.int64)
+    for i in range(X.shape[1]):
+        xMin, xMax = X[:,i].min(), X[:,i].max()
+        if xMin == xMax:
+            xMin, xMax = xMin - 0.5, xMax + 0.5
+        edges = np.linspace(xMin, xMax, bins+1)
+        B[:,i] = np.clip(np.searchsorted(edges, X[:,i], side='right') - 1,
+                         0, bins-1)
+    return B
+
+def entropy_rows(c):
+    '''
+    A function to calculate the Shannon entropy (in bits) of each row of a
+    count matrix.
+    input parameters:
+          c:        The count matrix (one histogram per row).
+    returns:
+          H:        A vector of the entropy of each row.
+    '''
+    p = c / c.sum(axis=1, keepdims=True).astype(float)
+    plogp = np.zeros_like(p)
+    np.log2(p, out=plogp, where=p>0)
+    return -np.sum(p * plogp, axis=1)
+
+def mi_rows(B, H, bins, rowStart, rowEnd):
+    '''
+    A function to calculate the mutual information of variables rowStart,
+    ..., rowEnd-1 against all the following variables.
+    input parameters:
+          B:        The discretized data (see discretize).
+          H:        A vector of the entropy of each variable.
+          bins:     The number of bins.
+          rowStart: The first variable of the block.
+          rowEnd:   The variable after the last one of the block.
+    returns:
+          A:        The mutual information, block rows x variables (0 for
+                    the variables up to and including each row).
+    '''
+    nVar = B.shape[1]
+    A = np.zeros([rowEnd-rowStart, nVar])
+    for i in range(rowStart, rowEnd):
+        nj = nVar - i - 1
+        if nj == 0:
+            continue
+        code = B[:,i:i+1]*bins + B[:,i+1:] + np.arange(nj)*bins*bins
+        c_XY = np.bincount(code.ravel(), minlength=nj*bins*bins)
+        H_XY = entropy_rows(c_XY.reshape(nj, bins*bins))
+        A[i-rowStart, i+1:] = H[i] + H[i+1:] - H_XY
+    return A
+
+def init_worker(B, H, bins):
+    '''
+    A function to keep the discretized data and the entropies in each
+    worker process.
+    '''
+    global BWorker, HWorker, binsWorker
+    BWorker = B
+    HWorker = H
+    binsWorker = bins
+
+def mi_rows_worker(rows):
+    '''
+    A function to run mi_rows on a block of rows in a worker process.
+    '''
+    rowStart, rowEnd = rows
+    return mi_rows(BWorker, HWorker, binsWorker, rowStart, rowEnd)
+
+def mutual_information_fast(X, bins, nProc=1, blockSize=50):
+    '''
+    A function to calculate the mutual information between all pairs of
+    variables (the same values as mutual_information).
+    input parameters:
+          X:         The data matrix (observations x variables).
+          bins:      The number of bins.
+          nProc:     The number of worker processes. The default is 1.
+          blockSize: The number of rows calculated at a time. The default
+                     is 50.
+    returns:
+          A:         The mutual information matrix (variables x variables).
+    '''
+    B = discretize(X, bins)
+    nVar = B.shape[1]
+    c_X = np.zeros([nVar, bins])
+    for i in range(nVar):
+        c_X[i,:] = np.bincount(B[:,i], minlength=bins)
+    H = entropy_rows(c_X)
+    blocks = [(iStart, min(iStart+blockSize, nVar))
+              for iStart in range(0, nVar, blockSize)]
+    if nProc > 1:
+        with Pool(nProc, init_worker, (B, H, bins)) as pool:
+            listA = pool.map(mi_rows_worker, blocks)
+    else:
+        listA = [mi_rows(B, H, bins, *x) for x in blocks]
+    A = np.vstack(listA)
+    return A + A.T
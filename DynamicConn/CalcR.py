@@ -2,22 +2,18 @@ import numpy as np
 import matplotlib.pyplot as plt
 from sklearn.covariance import GraphicalLassoCV
 from sklearn.preprocessing import StandardScaler
+from dyn_corr import window_weights, dyn_corr_iter
+from rmat_store import save_rmat_iter
 
 
 ##### Function to extract time series data 
 def extract_winTS(X, timeStart, winSize):
     # extracting the window
     winX = X[(timeStart-winSize+1):(timeStart+1)]
-    # calculating the weights
-    th = winSize / 3
-    w0 = (1-np.exp(-1/th))/(1-np.exp(-winSize/th))
-    wt = []
-    for iT in range(1,winSize+1):
-        w = w0 * np.exp((iT - winSize)/th)
-        wt.append(w)
-    wt = np.array(wt).reshape(winSize,1)
+    # the (cached) weights
+    wt, decay = window_weights(winSize)
     # weighting with wt
-    wwinX = wt * winX
+    wwinX = wt.reshape(winSize,1) * winX
     return wwinX
 
 
@@ -39,13 +35,7 @@ ts_std = StandardScaler().fit_transform(ts)   # scaling the data
 
 ##### plotting the weight and weighted data
 # calculating weights
-th = winSizeTR / 3
-w0 = (1-np.exp(-1/th))/(1-np.exp(-winSizeTR/th))
-wt = []
-for iT in range(1,winSizeTR+1):
-    w = w0 * np.exp((iT - winSizeTR)/th)
-    wt.append(w)
-wt = np.array(wt).reshape(winSizeTR,1)
+wt, decay = window_weights(winSizeTR)
 
 # extracting weighted time series
 wts = extract_winTS(ts_std, winSizeTR, winSizeTR)
@@ -74,30 +64,12 @@ plt.show()
 
 
 
-###### Calculating correlation across windows
-Rmat = []
-for iTime in range(winSizeTR,nTime):
-    # extracting weighted time series
-    wts = extract_winTS(ts_std, iTime, winSizeTR)
-    # correlation matrix
-    R = np.corrcoef(wts, rowvar=False)
-    # zeroing the main diagonal
-    for i in range(R.shape[0]):
-        R[i,i] = 0
-    # keeping R
-    Rmat.append(R)
-
-Rmat = np.array(Rmat)
-
-
-
-###### Saving the Rmat for future use
-np.savez('DataDynamicConn/Leiden_sub39335_Rt2_K200_Rmat.npz',
-         Rmat = Rmat,
-         winSize = winSizeTR,
-         nodes = nodes,
-         xyz = xyz)
-
-
-
-
+###### Calculating correlation across windows, and saving them for future use
+# the weighted moments are updated recursively as the window slides, and
+# each window is written to the (upper-triangle, float32) Rmat store as it
+# is calculated
+save_rmat_iter('DataDynamicConn/Leiden_sub39335_Rt2_K200_Rmat.rmat',
+               dyn_corr_iter(ts_std, winSizeTR, winType='tapered'),
+               nTime - winSizeTR,
+               nodes, xyz,
+               meta = {'winSize': winSizeTR, 'winType': 'tapered'})
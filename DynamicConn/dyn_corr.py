@@ -0,0 +1,131 @@
+#
+# dyn_corr.py
+#
+# time-resolved (sliding-window) correlation matrices. The weighted first
+# and second moments of the window are updated recursively as the window
+# slides by one time point, so each window costs O(N^2) instead of
+# O(L x N^2). The correlation of each window is the same as np.corrcoef of
+# the weighted time series in the window (as extract_winTS in CalcR.py).
+#
+
+import numpy as np
+
+
+# cache of window weights, keyed by (window size, window type)
+weightCache = {}
+
+
+##### function to calculate the window weights
+def window_weights(winSize, winType='tapered'):
+    '''
+    A function to calculate (and cache) the weights of a sliding window.
+    input parameters:
+          winSize:  The window width L, in time points.
+          winType:  The type of the window.
+                       'tapered':     exponentially tapered window of width
+                                      L, with time constant L/3 (default)
+                       'boxcar':      all the weights are 1
+                       'exponential': the same exponential weights as
+                                      'tapered', but without the window
+                                      edge (the whole past is included)
+    returns:
+          wt:       A vector of the L weights, oldest first (for
+                    'exponential', the most recent L weights).
+          decay:    The factor by which a weight decays per time point.
+    '''
+    key = (winSize, winType)
+    if key not in weightCache:
+        if winType=='boxcar':
+            wt = np.ones(winSize)
+            decay = 1.0
+        elif winType in ['tapered', 'exponential']:
+            th = winSize / 3
+            w0 = (1-np.exp(-1/th))/(1-np.exp(-winSize/th))
+            wt = w0 * np.exp((np.arange(1,winSize+1) - winSize)/th)
+            decay = np.exp(-1/th)
+        else:
+            raise ValueError('Unknown window type: %s' % winType)
+        weightCache[key] = (wt, decay)
+    return weightCache[key]
+
+
+
+##### function to calculate a correlation matrix from weighted moments
+def moments_to_corr(S1, S2, n):
+    '''
+    A function to calculate the correlation matrix (with zero diagonal)
+    of n weighted time points from their sum S1 and sum of outer
+    products S2.
+    '''
+    C = S2 - np.outer(S1, S1) / n
+    d = np.sqrt(np.diag(C))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        R = C / np.outer(d, d)
+    np.fill_diagonal(R, 0)
+    return R
+
+
+
+##### generator of sliding-window correlation matrices
+def dyn_corr_iter(X, winSize, winType='tapered', nResync=None):
+    '''
+    A generator of sliding-window correlation matrices, updated recursively.
+    input parameters:
+          X:        An array of time series (time points x nodes), e.g.,
+                    standardized ROI time series.
+          winSize:  The window width L, in time points.
+          winType:  'tapered', 'boxcar' or 'exponential' (see window_weights).
+          nResync:  The moments are recalculated from scratch every nResync
+                    windows, to keep the rounding errors of the recursive
+                    update from accumulating. The default is None, meaning
+                    every winSize windows.
+    yields:
+          iTime:    The last time point of the window. Windows end at
+                    iTime = winSize, ..., nTime-1 (as in CalcR.py).
+          R:        The correlation matrix of the window, zero diagonal.
+    '''
+    X = np.asarray(X, dtype=np.float64)
+    nTime = X.shape[0]
+    wt, decay = window_weights(winSize, winType)
+    w0 = wt[-1]
+    if nResync is None:
+        nResync = winSize
+    for iWin, iTime in enumerate(range(winSize, nTime)):
+        if winType=='exponential':
+            # all the time points up to iTime
+            n = iTime + 1
+            if iWin==0:
+                wAll = w0 * decay**np.arange(iTime, -1, -1)
+                S1 = np.dot(wAll, X[:n])
+                S2 = np.dot((wAll**2 * X[:n].T), X[:n])
+            else:
+                S1 = decay*S1 + w0*X[iTime]
+                S2 = decay**2*S2 + w0**2*np.outer(X[iTime], X[iTime])
+        else:
+            # the window iTime-winSize+1, ..., iTime
+            n = winSize
+            if iWin % nResync == 0:
+                winX = X[(iTime-winSize+1):(iTime+1)]
+                S1 = np.dot(wt, winX)
+                S2 = np.dot((wt**2 * winX.T), winX)
+            else:
+                xOld = X[iTime-winSize]
+                xNew = X[iTime]
+                wOld = wt[0]*decay
+                S1 = decay*S1 - wOld*xOld + w0*xNew
+                S2 = (decay**2*S2 - wOld**2*np.outer(xOld, xOld) +
+                      w0**2*np.outer(xNew, xNew))
+        yield iTime, moments_to_corr(S1, S2, n)
+
+
+
+##### function to calculate all sliding-window correlation matrices
+def dyn_corr(X, winSize, winType='tapered', nResync=None):
+    '''
+    A function to calculate the sliding-window correlation matrices of all
+    windows (see dyn_corr_iter for the parameters).
+    returns:
+          Rmat:     An array of correlation matrices, windows x nodes x nodes.
+    '''
+    return np.array([R for iTime, R in
+                     dyn_corr_iter(X, winSize, winType, nResync)])
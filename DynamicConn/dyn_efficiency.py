@@ -0,0 +1,110 @@
+#
+# dyn_efficiency.py
+#
+# nodal global and local efficiency of the hard-thresholded network of
+# every window in a time-resolved connectivity (Rmat) store. Each window's
+# network is built directly from its upper-triangle row as a sparse
+# adjacency matrix, and the windows are spread across a pool of worker
+# processes, each of which memory-maps the store once.
+#
+
+import numpy as np
+from multiprocessing import Pool
+import sys
+sys.path.append('../Atlas')
+from net_builder import conn_transform, top_m, triu_to_ij, edges_to_adj
+from net_efficiency import nodal_eglob, nodal_eloc
+from rmat_store import load_rmat
+
+
+# the store, opened once in each worker process
+rDataWorker = None
+nodesWorker = None
+
+
+##### function to build a window's network from its upper-triangle row
+def window_adj(rVec, nNodes, K, cType=1):
+    '''
+    A function to construct the hard-thresholded network of a window from
+    its upper-triangle vector (a row of the Rmat store), the same network
+    as net_builder_HardTh on the dense correlation matrix. The Fisher z-
+    transform keeps the order of the connections, so the network is the
+    same whether or not the store is Fisher z-transformed.
+    input parameters:
+          rVec:     The upper-triangle vector of the window.
+          nNodes:   The number of nodes.
+          K:        The target K, the average connections at each node.
+          cType:    Type of functional connectivity (see vec_upper).
+    returns:
+          A:        The symmetric binary CSR adjacency matrix.
+    '''
+    VecR = np.array(rVec, dtype=np.float64)
+    conn_transform(VecR, cType)
+    VecR[np.isnan(VecR)] = -np.inf
+    m = int(np.ceil(K*nNodes/2.0))  # the number of edges
+    indSel, RTh = top_m(VecR, m)
+    trI, trJ = triu_to_ij(indSel, nNodes)
+    return edges_to_adj(trI, trJ, nNodes)
+
+
+
+##### worker functions
+def init_worker(fRmat):
+    '''
+    A function to open (memory-map) the Rmat store once in each worker
+    process.
+    '''
+    global rDataWorker, nodesWorker
+    rDataWorker, nodesWorker, xyz, meta = load_rmat(fRmat)
+
+
+def window_efficiency(args):
+    '''
+    A function to calculate the nodal local and global efficiency of a
+    single window. Called in a worker process.
+    input parameters:
+          args:     A tuple (iWin, K, cType).
+    returns:
+          iWin:     The window index.
+          Eloc:     A vector of nodal local efficiencies.
+          Eglob:    A vector of nodal global efficiencies.
+    '''
+    iWin, K, cType = args
+    nNodes = len(nodesWorker)
+    A = window_adj(rDataWorker[iWin], nNodes, K, cType)
+    Eglob = nodal_eglob(A)
+    Eloc = nodal_eloc(A)
+    return iWin, Eloc, Eglob
+
+
+
+##### the batch driver
+def dyn_efficiency(fRmat, K, cType=1, nProc=4):
+    '''
+    A function to calculate the nodal local and global efficiency of the
+    hard-thresholded network of every window in an Rmat store, windows in
+    parallel.
+    input parameters:
+          fRmat:    The Rmat store directory (see rmat_store.py).
+          K:        The target K, the average connections at each node.
+          cType:    Type of functional connectivity (see vec_upper).
+          nProc:    The number of worker processes. The default is 4.
+    returns:
+          ElocMat:  An array of nodal local efficiencies, nodes x windows.
+          EglobMat: An array of nodal global efficiencies, nodes x windows.
+    '''
+    rData, nodes, xyz, meta = load_rmat(fRmat)
+    nWin = rData.shape[0]
+    ElocMat = np.zeros((len(nodes),nWin))
+    EglobMat = np.zeros((len(nodes),nWin))
+    listArgs = [(iWin, K, cType) for iWin in range(nWin)]
+    if nProc<=1:
+        init_worker(fRmat)
+        listOut = [window_efficiency(x) for x in listArgs]
+    else:
+        with Pool(nProc, init_worker, (fRmat,)) as pool:
+            listOut = pool.map(window_efficiency, listArgs)
+    for iWin, Eloc, Eglob in listOut:
+        ElocMat[:,iWin] = Eloc
+        EglobMat[:,iWin] = Eglob
+    return ElocMat, EglobMat
@@ -1,6 +1,9 @@
 import numpy as np
 import nibabel as nib
 import os
+import sys
+sys.path.append('../../Atlas')
+from fmri_stream import fmri_ntime
 
 # directory business
 baseDir = '/home/satoru/Projects/Connectome/Data/1000FCP/Leiden_2200/Processed/'
@@ -8,13 +11,12 @@ fPath = 'Processed.feat/reg/func2standard_r_bp_reg_ms.nii.gz'
 listDir = os.listdir(baseDir)
 listSubj = [x for x in listDir if 'sub' in x]
 
-# extracting number of time points
+# extracting number of time points (from the NIfTI header only)
 nTimePoints = []
 for iSubj in listSubj:
     subjDir = os.path.join(baseDir,iSubj)
     subjFile = os.path.join(subjDir,fPath)
-    X_fMRI = nib.load(subjFile).get_data()
-    nTimePoints.append(X_fMRI.shape[-1])
+    nTimePoints.append(fmri_ntime(subjFile))
 
 # printing out the results
 print('%-12s' % 'Subject' + '%-14s' % 'N time points')
@@ -0,0 +1,137 @@
+#
+# batch_extract.py
+#
+# extracts ROI time series for many subjects of a 1000FCP site directory,
+# spread across a pool of worker processes. Each worker streams one
+# subject's fMRI data at a time (in time chunks), so the number of fMRI
+# volumes in memory is bounded by nProc x chunkMB. Subjects whose output
+# is newer than both their fMRI data and the atlas are skipped.
+#
+
+import os
+import numpy as np
+import nibabel as nib
+from multiprocessing import Pool
+import sys
+sys.path.append('../../Atlas')
+from roi_extract import extract_roits_multi, save_roits_multi
+
+
+# path to the processed fMRI data within a subject directory
+fPathfMRI = 'Processed.feat/reg/func2standard_r_bp_reg_ms.nii.gz'
+
+# the atlas, loaded once in each worker process
+X_atlasWorker = None
+
+
+##### function to list subjects in a site directory
+def list_subjects(siteDir):
+    '''
+    A function to list subject directories (names containing 'sub') in a
+    1000FCP site directory, in sorted order.
+    '''
+    listDir = os.listdir(siteDir)
+    return sorted([x for x in listDir if 'sub' in x and
+                   os.path.isdir(os.path.join(siteDir, x))])
+
+
+
+##### function to check if an output file is up to date
+def is_up_to_date(fOut, listIn):
+    '''
+    A function to check whether the output file exists and is newer than
+    all of the input files in listIn.
+    '''
+    if not os.path.isfile(fOut):
+        return False
+    tOut = os.path.getmtime(fOut)
+    return all(os.path.getmtime(f) <= tOut for f in listIn)
+
+
+
+##### worker functions
+def init_worker(fAtlas):
+    '''
+    A function to load the atlas once in each worker process.
+    '''
+    global X_atlasWorker
+    X_atlasWorker = np.asarray(nib.load(fAtlas).dataobj)
+    if X_atlasWorker.ndim==3:
+        X_atlasWorker = X_atlasWorker[:,:,:,np.newaxis]
+
+
+def extract_subject(args):
+    '''
+    A function to extract the ROI time series of a single subject and
+    save them. Called in a worker process.
+    input parameters:
+          args:     A tuple (f_fMRI, fOut, listInd, listK, chunkMB).
+    returns:
+          fOut:     The output file name.
+    '''
+    f_fMRI, fOut, listInd, listK, chunkMB = args
+    tsList, nodeList, xyzList = extract_roits_multi(f_fMRI, X_atlasWorker,
+                                                    listInd, chunkMB)
+    if len(listK)==1:
+        # a single K -- the same .npz layout as the single-atlas files
+        np.savez(fOut, ts = tsList[0], nodes = nodeList[0], xyz = xyzList[0])
+    else:
+        save_roits_multi(fOut, listK, tsList, nodeList, xyzList)
+    return fOut
+
+
+
+##### the batch driver
+def batch_extract(siteDir, fAtlas, fOutPattern, K, targetK=None,
+                  listSubj=None, nProc=4, chunkMB=256, force=False):
+    '''
+    A function to extract ROI time series for many subjects in parallel.
+    input parameters:
+          siteDir:     The site directory containing subject directories.
+          fAtlas:      The atlas image file (3D, or 4D with one volume per K).
+          fOutPattern: The output file name, with {subj} replaced by the
+                       subject ID. E.g., '../DataDynamicConn/Leiden_{subj}_Rt2_K200.npz'
+          K:           The list of atlas labels for the volumes of fAtlas
+                       (e.g., K of the Rt2 atlas). Use [0] for a 3D atlas.
+          targetK:     A list of K to be extracted. The default is None,
+                       meaning all K. With a single K, the output has the
+                       same layout as extract_roits; otherwise all K are
+                       in one file (see save_roits_multi).
+          listSubj:    A list of subjects. The default is None, meaning all
+                       the subjects in siteDir.
+          nProc:       The number of worker processes, i.e., the number of
+                       subjects in flight at any time. The default is 4.
+          chunkMB:     The memory budget for a chunk of fMRI data in each
+                       worker, in megabytes. The default is 256.
+          force:       If True, subjects are processed even if their output
+                       is up to date. The default is False.
+    returns:
+          listOut:     A list of output files written.
+    '''
+
+    if targetK is None:
+        targetK = list(K)
+    listInd = [list(K).index(k) for k in targetK]
+    if listSubj is None:
+        listSubj = list_subjects(siteDir)
+
+    # subjects to be processed
+    listArgs = []
+    for iSubj in listSubj:
+        f_fMRI = os.path.join(siteDir, iSubj, fPathfMRI)
+        fOut = fOutPattern.format(subj=iSubj)
+        if not os.path.isfile(f_fMRI):
+            print('No fMRI data for %s, skipped' % iSubj)
+            continue
+        if not force and is_up_to_date(fOut, [f_fMRI, fAtlas]):
+            continue
+        listArgs.append((f_fMRI, fOut, listInd, targetK, chunkMB))
+
+    # extraction across the pool
+    listOut = []
+    if len(listArgs)>0:
+        with Pool(min(nProc, len(listArgs)), init_worker, (fAtlas,)) as pool:
+            for fOut in pool.imap_unordered(extract_subject, listArgs):
+                print('Done: %s' % fOut)
+                listOut.append(fOut)
+    return listOut
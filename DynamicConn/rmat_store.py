@@ -0,0 +1,180 @@
+#
+# rmat_store.py
+#
+# a compact, memory-mapped on-disk format for time-resolved connectivity
+# (Rmat). Only the upper triangle (without the diagonal) of each window's
+# correlation matrix is stored, as a float32 row of rmat.npy (windows x
+# node pairs), optionally Fisher z-transformed. A store is a directory with
+# rmat.npy, nodes.npy, optional xyz.npy, and a meta.json file (window size,
+# Fisher z, ...). Windows are written and read in chunks of time, so the
+# dense windows x nodes x nodes cube is never built.
+#
+
+import os
+import json
+import numpy as np
+from numpy.lib.format import open_memmap
+import sys
+sys.path.append('../Atlas')
+from net_builder import vec_upper
+
+
+# correlations are clipped to this before the Fisher z-transform
+rMax = 1 - 1e-6
+
+
+##### functions to convert between matrices and upper-triangle vectors
+def mat_to_vec(R, fisherZ=False):
+    '''
+    A function to extract the upper triangle (without the diagonal) of a
+    correlation matrix, in the order of np.triu_indices(N, 1), as float32
+    (see vec_upper).
+    '''
+    rVec = vec_upper(R)
+    # (vec_upper marks nan as -inf; the store keeps nan)
+    rVec[np.isneginf(rVec)] = np.nan
+    if fisherZ:
+        rVec = np.arctanh(np.clip(rVec, -rMax, rMax))
+    return rVec.astype(np.float32)
+
+
+def vec_to_mat(rVec, nNodes, fisherZ=False):
+    '''
+    A function to rebuild the (symmetric, zero diagonal) correlation matrix
+    from its upper-triangle vector. If the vector is Fisher z-transformed,
+    it is transformed back to correlations.
+    '''
+    rVec = np.asarray(rVec, dtype=np.float64)
+    if fisherZ:
+        rVec = np.tanh(rVec)
+    R = np.zeros((nNodes, nNodes))
+    indR = np.triu_indices(nNodes, 1)
+    R[indR] = rVec
+    R.T[indR] = rVec
+    return R
+
+
+
+##### function to write a store window by window
+def save_rmat_iter(fStore, Riter, nWin, nodes, xyz=None, fisherZ=False,
+                   meta=None, chunkSize=64):
+    '''
+    A function to write time-resolved connectivity to a store, from a
+    sequence of correlation matrices (e.g., dyn_corr_iter in dyn_corr.py),
+    without keeping them in memory.
+    input parameters:
+          fStore:    The output directory name (e.g., 'Sub_K200_Rmat.rmat').
+          Riter:     An iterable of nWin correlation matrices (nodes x nodes),
+                     or of (iTime, R) tuples as yielded by dyn_corr_iter.
+          nWin:      The number of windows.
+          nodes:     A vector of node IDs.
+          xyz:       An array of node coordinates (optional).
+          fisherZ:   If True, the correlations are stored Fisher z-
+                     transformed. The default is False.
+          meta:      A dictionary of provenance information, e.g., the
+                     window size (optional).
+          chunkSize: The number of windows buffered before writing.
+    '''
+    nNodes = len(nodes)
+    nPair = nNodes*(nNodes-1)//2
+    if not os.path.isdir(fStore):
+        os.makedirs(fStore)
+    rData = open_memmap(os.path.join(fStore, 'rmat.npy'), mode='w+',
+                        dtype=np.float32, shape=(nWin, nPair))
+    buf = np.zeros((chunkSize, nPair), dtype=np.float32)
+    iWin = 0
+    nBuf = 0
+    for R in Riter:
+        if isinstance(R, tuple):
+            R = R[1]
+        buf[nBuf] = mat_to_vec(R, fisherZ)
+        nBuf += 1
+        if nBuf==chunkSize:
+            rData[iWin:(iWin+nBuf)] = buf
+            iWin += nBuf
+            nBuf = 0
+    rData[iWin:(iWin+nBuf)] = buf[:nBuf]
+    iWin += nBuf
+    if iWin!=nWin:
+        raise ValueError('Expected %d windows, got %d' % (nWin, iWin))
+    rData.flush()
+    del rData
+    np.save(os.path.join(fStore, 'nodes.npy'), np.asarray(nodes))
+    fXYZ = os.path.join(fStore, 'xyz.npy')
+    if xyz is not None:
+        np.save(fXYZ, np.asarray(xyz))
+    elif os.path.isfile(fXYZ):
+        os.remove(fXYZ)
+    metaOut = {'nNodes': int(nNodes), 'nWin': int(nWin),
+               'fisherZ': bool(fisherZ)}
+    if meta is not None:
+        metaOut.update(meta)
+    with open(os.path.join(fStore, 'meta.json'), 'w') as f:
+        json.dump(metaOut, f, indent=1, default=float)
+
+
+def save_rmat(fStore, Rmat, nodes, xyz=None, fisherZ=False, meta=None):
+    '''
+    A function to write a dense Rmat array (windows x nodes x nodes) to a
+    store (see save_rmat_iter).
+    '''
+    save_rmat_iter(fStore, Rmat, len(Rmat), nodes, xyz, fisherZ, meta)
+
+
+
+##### functions to read a store
+def load_rmat(fStore, mmap=True):
+    '''
+    A function to open a time-resolved connectivity store.
+    input parameters:
+          fStore:   The store directory name.
+          mmap:     If True (the default), rmat.npy is memory-mapped
+                    instead of read into memory.
+    returns:
+          rData:    The array of upper-triangle vectors, windows x node
+                    pairs (float32; Fisher z if meta['fisherZ']). Each row
+                    is a feature row, e.g., for clustering of states.
+          nodes:    A vector of node IDs.
+          xyz:      The node coordinates (None if not stored).
+          meta:     A dictionary of provenance information.
+    '''
+    mmapMode = 'r' if mmap else None
+    rData = np.load(os.path.join(fStore, 'rmat.npy'), mmap_mode=mmapMode)
+    nodes = np.load(os.path.join(fStore, 'nodes.npy'))
+    fXYZ = os.path.join(fStore, 'xyz.npy')
+    xyz = np.load(fXYZ) if os.path.isfile(fXYZ) else None
+    with open(os.path.join(fStore, 'meta.json')) as f:
+        meta = json.load(f)
+    return rData, nodes, xyz, meta
+
+
+def iter_rmat_chunks(fStore, chunkSize=64):
+    '''
+    A generator to read the feature rows of a store, a chunk of windows at
+    a time.
+    yields:
+          wStart:   The first window of the chunk.
+          wEnd:     One past the last window of the chunk.
+          rChunk:   The upper-triangle vectors of the chunk, as stored.
+    '''
+    rData, nodes, xyz, meta = load_rmat(fStore)
+    nWin = rData.shape[0]
+    for wStart in range(0, nWin, chunkSize):
+        wEnd = min(wStart + chunkSize, nWin)
+        yield wStart, wEnd, np.asarray(rData[wStart:wEnd])
+
+
+def iter_rmat_windows(fStore, chunkSize=64):
+    '''
+    A generator to read the windows of a store one at a time, as dense
+    correlation matrices (zero diagonal, Fisher z undone).
+    yields:
+          iWin:     The window index.
+          R:        The correlation matrix of the window.
+    '''
+    rData, nodes, xyz, meta = load_rmat(fStore)
+    nNodes = meta['nNodes']
+    fisherZ = meta['fisherZ']
+    for wStart, wEnd, rChunk in iter_rmat_chunks(fStore, chunkSize):
+        for iWin in range(wStart, wEnd):
+            yield iWin, vec_to_mat(rChunk[iWin-wStart], nNodes, fisherZ)
@@ -0,0 +1,257 @@
+#
+# state_cluster.py
+#
+# k-means clustering of time-resolved connectivity into states. The edge
+# features (upper-triangle rows of Rmat stores) can be reduced first by
+# randomized PCA, the sweep over the number of clusters runs across a pool
+# of worker processes (in fixed chains of Ks, each warm-starting K+1
+# clusters from the K cluster solution), all random number generators are
+# seeded so labels are reproducible (for any number of processes), and the
+# elbow curve (with the centroids of every K) is cached in a file. A
+# mini-batch mode handles windows concatenated over many subjects.
+#
+
+import os
+import hashlib
+import numpy as np
+from multiprocessing import Pool
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.decomposition import PCA
+from rmat_store import iter_rmat_chunks
+
+
+# the data, shared with the worker processes
+XWorker = None
+
+
+##### functions to prepare the feature rows
+def reduce_dim(X, nComp=None, seed=0):
+    '''
+    A function to reduce the dimensionality of the feature rows by
+    randomized PCA.
+    input parameters:
+          X:        The feature rows (windows x edges).
+          nComp:    The number of principal components. The default is None,
+                    meaning no reduction. With nComp >= the number of
+                    windows, the distances between windows (and thus the
+                    clusters) are unchanged.
+          seed:     The seed of the randomized SVD.
+    returns:
+          XRed:     The reduced feature rows (windows x nComp).
+          pca:      The fitted PCA object (None if no reduction), e.g., to
+                    map centroids back with pca.inverse_transform.
+    '''
+    if nComp is None:
+        return np.asarray(X), None
+    nComp = min(nComp, X.shape[0], X.shape[1])
+    pca = PCA(n_components=nComp, svd_solver='randomized', random_state=seed)
+    XRed = pca.fit_transform(np.asarray(X))
+    return XRed, pca
+
+
+def stack_rmat(listStores, pca=None, chunkSize=256):
+    '''
+    A function to concatenate the feature rows of the Rmat stores of many
+    subjects, a chunk of windows at a time. If a fitted PCA is given, each
+    chunk is projected as it is read, so the edge features of all the
+    subjects are never in memory at once.
+    input parameters:
+          listStores: A list of Rmat store directories.
+          pca:        A fitted PCA object (optional; see reduce_dim).
+          chunkSize:  The number of windows read at a time.
+    returns:
+          X:          The concatenated (projected) feature rows.
+          subjInd:    A vector of the index (in listStores) of the subject
+                      of each row.
+    '''
+    XList = []
+    subjInd = []
+    for iSubj, fStore in enumerate(listStores):
+        for wStart, wEnd, rChunk in iter_rmat_chunks(fStore, chunkSize):
+            if pca is not None:
+                rChunk = pca.transform(rChunk)
+            XList.append(rChunk)
+            subjInd.append(np.full(wEnd-wStart, iSubj))
+    return np.vstack(XList), np.hstack(subjInd)
+
+
+
+##### k-means functions
+def make_kmeans(nClus, init='k-means++', seed=0, miniBatch=False,
+                batchSize=1024):
+    '''
+    A function to set up a (mini-batch) k-means object with a fixed seed.
+    With an init array of centroids, a single initialization is run.
+    '''
+    nInit = 1 if isinstance(init, np.ndarray) else 10
+    if miniBatch:
+        return MiniBatchKMeans(n_clusters=nClus, init=init, n_init=nInit,
+                               batch_size=batchSize, random_state=seed)
+    return KMeans(n_clusters=nClus, init=init, n_init=nInit,
+                  random_state=seed)
+
+
+def add_centroid(X, cent, seed=0):
+    '''
+    A function to add a centroid to a k-means solution for a warm start
+    with one more cluster: the cluster with the largest sum of squared
+    distances is split in two by 2-means on its members.
+    '''
+    D = ((X**2).sum(axis=1)[:,np.newaxis] - 2*np.dot(X, cent.T) +
+         (cent**2).sum(axis=1)[np.newaxis,:])
+    labels = np.argmin(D, axis=1)
+    clusSSE = np.bincount(labels, weights=D.min(axis=1), minlength=len(cent))
+    iSplit = np.argmax(clusSSE)
+    XSplit = X[labels==iSplit]
+    if len(XSplit)<2:
+        return np.vstack((cent, X[np.argmax(D.min(axis=1))]))
+    km = KMeans(n_clusters=2, n_init=3, random_state=seed).fit(XSplit)
+    return np.vstack((np.delete(cent, iSplit, axis=0), km.cluster_centers_))
+
+
+def kmeans_chain(X, listK, seed=0, miniBatch=False, batchSize=1024):
+    '''
+    A function to run k-means for increasing numbers of clusters, each
+    warm-started from the previous solution (the first one from k-means++).
+    returns:
+          SSE:      A list of the sum of squared distances, for each K.
+          centList: A list of centroid arrays, for each K.
+    '''
+    SSE = []
+    centList = []
+    cent = None
+    for nClus in listK:
+        if cent is not None and len(cent)==nClus-1:
+            init = add_centroid(X, cent, seed)
+        else:
+            init = 'k-means++'
+        km = make_kmeans(nClus, init, seed, miniBatch, batchSize)
+        km.fit(X)
+        cent = km.cluster_centers_
+        if miniBatch:
+            # the inertia of the whole data, not of the last mini-batch
+            SSE.append(-km.score(X))
+        else:
+            SSE.append(km.inertia_)
+        centList.append(cent)
+    return SSE, centList
+
+
+def init_worker(X):
+    '''
+    A function to keep the feature rows in each worker process.
+    '''
+    global XWorker
+    XWorker = X
+
+
+def kmeans_chain_worker(args):
+    '''
+    A function to run kmeans_chain in a worker process.
+    '''
+    listK, seed, miniBatch, batchSize = args
+    return kmeans_chain(XWorker, listK, seed, miniBatch, batchSize)
+
+
+
+##### the K-sweep
+def kmeans_sweep(X, listK=range(1,31), seed=0, miniBatch=False,
+                 batchSize=1024, chainSize=5, nProc=4):
+    '''
+    A function to run k-means for a range of numbers of clusters, e.g., for
+    the elbow method. The (sorted) range is split into chains of chainSize
+    consecutive Ks, each a series of warm-started fits (see kmeans_chain),
+    and the chains are run across worker processes. The chains do not
+    depend on nProc, so neither do the results.
+    input parameters:
+          X:         The feature rows (windows x features).
+          listK:     A list of numbers of clusters. The default is 1-30.
+          seed:      The random seed for all the fits.
+          miniBatch: If True, mini-batch k-means is used (e.g., for windows
+                     concatenated over many subjects). The default is False.
+          batchSize: The mini-batch size.
+          chainSize: The number of Ks in a chain of warm-started fits. The
+                     default is 5.
+          nProc:     The number of worker processes. The default is 4.
+    returns:
+          listK:     The sorted list of numbers of clusters.
+          SSE:       A vector of the sum of squared distances, for each K.
+          centList:  A list of centroid arrays, for each K.
+    '''
+    listK = sorted(listK)
+    listArgs = [(listK[i:(i+chainSize)], seed, miniBatch, batchSize)
+                for i in range(0, len(listK), chainSize)]
+    if nProc<=1:
+        init_worker(X)
+        listOut = [kmeans_chain_worker(x) for x in listArgs]
+    else:
+        with Pool(min(nProc, len(listArgs)), init_worker, (X,)) as pool:
+            listOut = pool.map(kmeans_chain_worker, listArgs, chunksize=1)
+    SSE = np.hstack([x[0] for x in listOut])
+    centList = [cent for x in listOut for cent in x[1]]
+    return listK, SSE, centList
+
+
+def data_hash(X, *params):
+    '''
+    A function to calculate the SHA-1 hash of an array (its data, shape
+    and dtype) and parameters, hashing the array's buffer in place.
+    '''
+    X = np.ascontiguousarray(X)  # (no copy if X is C-contiguous)
+    h = hashlib.sha1(memoryview(X).cast('B'))
+    h.update(repr((X.shape, X.dtype.str)).encode())
+    h.update(repr(params).encode())
+    return h.hexdigest()
+
+
+def elbow_curve(X, fCache, listK=range(1,31), seed=0, miniBatch=False,
+                batchSize=1024, chainSize=5, nProc=4):
+    '''
+    A function to get the K-sweep (see kmeans_sweep) from the cache file
+    fCache, or to run it and cache it there. The cache is recalculated if
+    the data or the parameters have changed.
+    returns:
+          listK:     The sorted list of numbers of clusters.
+          SSE:       A vector of the sum of squared distances, for each K.
+          centList:  A list of centroid arrays, for each K.
+    '''
+    listK = sorted(listK)
+    key = data_hash(X, listK, seed, miniBatch, batchSize, chainSize)
+    if os.path.isfile(fCache):
+        infile = np.load(fCache)
+        if str(infile['key'])==key:
+            offset = np.cumsum([0] + list(infile['listK']))
+            centList = [infile['cent'][offset[i]:offset[i+1]]
+                        for i in range(len(listK))]
+            return list(infile['listK']), infile['SSE'], centList
+    listK, SSE, centList = kmeans_sweep(X, listK, seed, miniBatch,
+                                        batchSize, chainSize, nProc)
+    np.savez(fCache,
+             key = key,
+             listK = listK,
+             SSE = SSE,
+             cent = np.vstack(centList))
+    return listK, SSE, centList
+
+
+
+##### function to assign the windows to states
+def fit_states(X, nClus, init=None, seed=0, miniBatch=False, batchSize=1024):
+    '''
+    A function to cluster the windows into nClus states.
+    input parameters:
+          X:        The feature rows (windows x features).
+          nClus:    The number of clusters (states).
+          init:     Initial centroids, e.g., the centroids of nClus from
+                    the K-sweep, so the sweep solution is refined rather
+                    than recalculated. The default is None (k-means++).
+          seed:     The random seed.
+    returns:
+          y_clus:   The state of each window.
+          y_cent:   The centroids of the states.
+    '''
+    if init is None:
+        init = 'k-means++'
+    km = make_kmeans(nClus, init, seed, miniBatch, batchSize)
+    km.fit(X)
+    return km.labels_, km.cluster_centers_
@@ -1,22 +1,26 @@
 import networkx as nx
 import matplotlib.pyplot as plt
 import numpy as np
+import sys
+sys.path.append('../Atlas')
+from graph_store import read_adjlist_csr
+from net_efficiency import local_efficiency
 
-##### loading the network data
+##### loading the network data (as sparse adjacency matrices)
 # C Elegans neural network
-G_CEleg = nx.read_adjlist('DataNetStats/CElegans.adjlist')
+A_CEleg, nodes_CEleg = read_adjlist_csr('DataNetStats/CElegans.adjlist')
 # Power grid
-G_Power = nx.read_gml('DataNetStats/power.gml', label='id')
+A_Power = nx.to_scipy_sparse_array(nx.read_gml('DataNetStats/power.gml',
+                                               label='id'), format='csr')
 # Brain (ROI)
-G_ROI = nx.read_adjlist('DataNetStats/Oxford_sub16112_aal90_d5.adjlist')
+A_ROI, nodes_ROI = read_adjlist_csr('DataNetStats/Oxford_sub16112_aal90_d5.adjlist')
 # Brain (Voxel)
-G_Voxel = nx.read_adjlist('DataNetStats/Oxford_sub16112_voxel_d20.adjlist')
+A_Voxel, nodes_Voxel = read_adjlist_csr('DataNetStats/Oxford_sub16112_voxel_d20.adjlist')
 
 ##### Local efficiencies
-print('Local efficiencies')
-print('C. Elegans: %5.3f' % nx.local_efficiency(G_CEleg))
-print('Power grid: %5.3f' % nx.local_efficiency(G_Power))
-print('Brain (ROI): %5.3f' % nx.local_efficiency(G_ROI))
-print('Brain (Voxel): %5.3f' % nx.local_efficiency(G_Voxel))
-
-
+if __name__ == '__main__':
+    print('Local efficiencies')
+    print('C. Elegans: %5.3f' % local_efficiency(A_CEleg))
+    print('Power grid: %5.3f' % local_efficiency(A_Power))
+    print('Brain (ROI): %5.3f' % local_efficiency(A_ROI))
+    print('Brain (Voxel): %5.3f' % local_efficiency(A_Voxel, nProc=4))
@@ -1,35 +1,15 @@
 import networkx as nx
 import numpy as np
 import matplotlib.pyplot as plt
-import random
 import pandas as pd
 
 
-##### network rewiring functions -- used to generate random network models
-def pick_4nodes(G):
-    a = random.choice(list(G.nodes()))  # a random node
-    b = random.choice(list(G[a]))       # a random node connected to a
-    while True:
-        # potential pool of nodes to draw c
-        cPool = (set(G.nodes())-set(G[a])).intersection(set(G.nodes())-set(G[b]))
-        c = random.choice(list(cPool))
-        # potential pool of nodes to draw d
-        dPool = (set(G[c])-set(G[a])).intersection(set(G[c])-set(G[b]))
-        if len(dPool)>0:
-            d = random.choice(list(dPool))
-            break
-    return [a,b,c,d]
-
-
-def rewire_multi(G,nIter):
-    H = G.copy()
-    for i in range(nIter):
-        list4nodes = pick_4nodes(H)
-        H.remove_edge(list4nodes[0],list4nodes[1])
-        H.remove_edge(list4nodes[2],list4nodes[3])
-        H.add_edge(list4nodes[0],list4nodes[2])
-        H.add_edge(list4nodes[1],list4nodes[3])
-    return H
+##### degree-preserving random network models
+import sys
+sys.path.append('../Atlas')
+from null_model import graph_to_edges
+from null_cache import cached_null_ensemble
+from rich_club import rich_club_norm
 
 
 
@@ -62,47 +42,26 @@ plt.show()
 
 
 
-##### Rich club coefficient (original network)
-RCdict = nx.rich_club_coefficient(G, normalized=False)
-
-# extracting the degree and rich club coeff from the dictionary
-K = [k for k, rc in RCdict.items()]
-RCorig = [rc for k, rc in RCdict.items()]
-
-
-
-##### Rich club coefficient (random network)
-RCrand = np.zeros_like(RCorig)
+##### Rich club coefficient (original vs random network)
 nIter = 200 # number of random networks to be generated
 print('Generating random networks ')
-for iIter in range(nIter):
-    print('.',end='')
-    if (iIter+1)%20 == 0:
-        print()
-
-    # first generating a random network
-    Grand = rewire_multi(G, 10*len(G.nodes()))
-
-    # rich club coefficient of the random network
-    RCrandDict = nx.rich_club_coefficient(Grand, normalized=False)
-
-    # extracting rich club coeff from the dictionary
-    tmpRC = np.array([rc for k, rc in RCrandDict.items()])
-    RCrand += tmpRC
-
+# the random networks are generated once and then read from the cache
+E, nodeList = graph_to_edges(G)
+# (a small network, so in this process rather than a process pool)
+ENull = cached_null_ensemble(E, len(nodeList), nIter, 10*len(nodeList),
+                             seed=0, nProc=1)
 print('done!')
-# dividing RC by the number of iterations to get the average
-RCrand /= nIter
-
-
-##### Rich club coefficient (original vs random)
-RCnorm = np.array(RCorig) / RCrand
+# rich club coefficients at all degrees K, of the original network and of
+# all the random networks at once, and the normalized rich club coefficient
+K, RCorig, RCrand, RCnorm, RCband = rich_club_norm(E, len(nodeList), ENull)
 
 
 ##### Finally plotting the rich club coefficients
 plt.plot(K,RCorig,'bo-', label='Original network')
 plt.plot(K,RCrand,'mo-', label='Random network')
 plt.plot(K,RCnorm,'ro-', label='Normalized RC')
+plt.fill_between(K,RCband[0],RCband[1],color='salmon',alpha=0.3,
+                 label='Random network (95%)')
 plt.xlabel('Degree')
 plt.ylabel('Rich club coefficient')
 plt.show()
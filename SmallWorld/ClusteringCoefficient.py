@@ -1,21 +1,27 @@
 import networkx as nx
 import matplotlib.pyplot as plt
 import numpy as np
+import sys
+sys.path.append('../Atlas')
+from graph_store import read_adjlist_csr
+from net_clustering import clustering_batch
 
-##### loading the network data
+##### loading the network data (as sparse adjacency matrices)
 # C Elegans neural network
-G_CEleg = nx.read_adjlist('DataSmallWorld/CElegans.adjlist')
+A_CEleg, nodes_CEleg = read_adjlist_csr('DataSmallWorld/CElegans.adjlist')
 # Power grid
-G_Power = nx.read_gml('DataSmallWorld/power.gml', label='id')
+A_Power = nx.to_scipy_sparse_array(nx.read_gml('DataSmallWorld/power.gml',
+                                               label='id'), format='csr')
 # Brain (ROI)
-G_ROI = nx.read_adjlist('DataSmallWorld/Oxford_sub16112_aal90_d5.adjlist')
+A_ROI, nodes_ROI = read_adjlist_csr('DataSmallWorld/Oxford_sub16112_aal90_d5.adjlist')
 # Brain (Voxel)
-G_Voxel = nx.read_adjlist('DataSmallWorld/Oxford_sub16112_voxel_d20.adjlist')
+A_Voxel, nodes_Voxel = read_adjlist_csr('DataSmallWorld/Oxford_sub16112_voxel_d20.adjlist')
 
 
-##### Clustering coefficients
+##### Clustering coefficients (and transitivity), all the networks at once
+Ci_list, C_list, T_list = clustering_batch([A_CEleg, A_Power, A_ROI, A_Voxel])
 print('Clustering coefficients')
-print('C. Elegans: %4.2f' % nx.average_clustering(G_CEleg))
-print('Power grid: %5.3f' % nx.average_clustering(G_Power))
-print('Brain (ROI): %4.2f' % nx.average_clustering(G_ROI))
-print('Brain (Voxel): %4.2f' % nx.average_clustering(G_Voxel))
+print('C. Elegans: %4.2f' % C_list[0])
+print('Power grid: %5.3f' % C_list[1])
+print('Brain (ROI): %4.2f' % C_list[2])
+print('Brain (Voxel): %4.2f' % C_list[3])
@@ -1,40 +1,53 @@
 import networkx as nx
 import matplotlib.pyplot as plt
 import numpy as np
-
-##### loading the network data
-# C Elegans neural network
-G_CEleg = nx.read_adjlist('DataSmallWorld/CElegans.adjlist')
-# Power grid
-G_Power = nx.read_gml('DataSmallWorld/power.gml', label='id')
-# Brain (ROI)
-G_ROI = nx.read_adjlist('DataSmallWorld/Oxford_sub16112_aal90_d5.adjlist')
-# Brain (Voxel)
-G_Voxel = nx.read_adjlist('DataSmallWorld/Oxford_sub16112_voxel_d20.adjlist')
-
-
-##### Path Length
-print('Average shortest path lengths')
-print('C. Elegans: %4.2f' % nx.average_shortest_path_length(G_CEleg))
-print('Power grid: %4.2f' % nx.average_shortest_path_length(G_Power))
-print('Brain (ROI): %4.2f' % nx.average_shortest_path_length(G_ROI))
-print('Brain (Voxel): %4.2f' % nx.average_shortest_path_length(G_Voxel))
-
-
-#### Checking the connected components
-ccSize_ROI = [len(c) for c in sorted(nx.connected_components(G_ROI),
-                                     key=len,
-                                     reverse=True)]
-print('Brain (ROI), connected component sizes: ', ccSize_ROI)
-
-ccSize_Voxel = [len(c) for c in sorted(nx.connected_components(G_Voxel),
-                                       key=len,
-                                       reverse=True)]
-print('Brain (Voxel), connected component sizes: ', ccSize_Voxel)
-
-
-##### Path length, giant component only
-GC_nodes_ROI = max(nx.connected_components(G_ROI), key=len)  # nodes in giant component
-GC_ROI = G_ROI.subgraph(GC_nodes_ROI)  # nodes & edges in giant component
-print('Path length, brain (ROI): %4.2f'  % nx.average_shortest_path_length(GC_ROI))
-
+import sys
+sys.path.append('../Atlas')
+from graph_store import read_adjlist_csr
+from path_length import giant_component, char_path_length
+from path_length import char_path_length_sampled
+
+# (the exact voxel path length runs in worker processes, so the script
+# only runs in the main process)
+if __name__ == '__main__':
+
+    ##### loading the network data (as sparse adjacency matrices)
+    # C Elegans neural network
+    A_CEleg, nodes_CEleg = read_adjlist_csr('DataSmallWorld/CElegans.adjlist')
+    # Power grid
+    A_Power = nx.to_scipy_sparse_array(
+        nx.read_gml('DataSmallWorld/power.gml', label='id'), format='csr')
+    # Brain (ROI)
+    A_ROI, nodes_ROI = read_adjlist_csr(
+        'DataSmallWorld/Oxford_sub16112_aal90_d5.adjlist')
+    # Brain (Voxel)
+    A_Voxel, nodes_Voxel = read_adjlist_csr(
+        'DataSmallWorld/Oxford_sub16112_voxel_d20.adjlist')
+
+
+    ##### Path Length
+    # (giant=False -- an error if the network is not connected)
+    print('Average shortest path lengths')
+    print('C. Elegans: %4.2f' % char_path_length(A_CEleg, giant=False)[0])
+    print('Power grid: %4.2f' % char_path_length(A_Power, giant=False)[0])
+    print('Brain (ROI): %4.2f' % char_path_length(A_ROI, giant=False)[0])
+    print('Brain (Voxel): %4.2f' % char_path_length(A_Voxel, giant=False)[0])
+
+
+    #### Checking the connected components
+    GC_ROI, ccSize_ROI = giant_component(A_ROI)
+    print('Brain (ROI), connected component sizes: ', ccSize_ROI.tolist())
+
+    GC_Voxel, ccSize_Voxel = giant_component(A_Voxel)
+    print('Brain (Voxel), connected component sizes: ', ccSize_Voxel.tolist())
+
+
+    ##### Path length, giant component only
+    print('Path length, brain (ROI): %4.2f'  % char_path_length(A_ROI)[0])
+    # the voxel network -- a quick estimate from 1000 sources first, then the
+    # exact value (all sources, across processes)
+    L, halfWidth, GC_Voxel = char_path_length_sampled(A_Voxel, nSample=1000)
+    print('Path length, brain (Voxel), estimate: %4.2f +/- %4.2f' %
+          (L, halfWidth))
+    print('Path length, brain (Voxel): %4.2f' %
+          char_path_length(A_Voxel, nProc=4)[0])
@@ -1,38 +1,18 @@
 import networkx as nx
 import matplotlib.pyplot as plt
 import numpy as np
-import random
 
-def pick_4nodes(G):
-    a = random.choice(list(G.nodes()))  # a random node
-    b = random.choice(list(G[a]))       # a random node connected to a
-    while True:
-        # potential pool of nodes to draw c
-        cPool = (set(G.nodes())-set(G[a])).intersection(set(G.nodes())-set(G[b]))
-        c = random.choice(list(cPool))
-        # potential pool of nodes to draw d
-        dPool = (set(G[c])-set(G[a])).intersection(set(G[c])-set(G[b]))
-        if len(dPool)>0:
-            d = random.choice(list(dPool))
-            break
-    return [a,b,c,d]
-
-
-def rewire_multi(G,nIter):
-    H = G.copy()
-    for i in range(nIter):
-        list4nodes = pick_4nodes(H)
-        H.remove_edge(list4nodes[0],list4nodes[1])
-        H.remove_edge(list4nodes[2],list4nodes[3])
-        H.add_edge(list4nodes[0],list4nodes[2])
-        H.add_edge(list4nodes[1],list4nodes[3])
-    return H
+##### degree-preserving random network models
+import sys
+sys.path.append('../Atlas')
+from null_model import graph_to_edges, edges_to_graph
+from null_cache import cached_null_ensemble
+from path_length import char_path_length
 
 
 def path_length_gc(G):
-    GC_nodes = max(nx.connected_components(G), key=len)  # giant component nodes
-    GC = G.subgraph(GC_nodes)
-    L = nx.average_shortest_path_length(GC)
+    A = nx.to_scipy_sparse_array(G, format='csr')
+    L, GCInd = char_path_length(A)  # giant component only
     return L
 
 
@@ -56,7 +36,11 @@ plt.title('Degree sequence (original network)\nsmallest to largest')
 plt.show()
 
 ##### Rewiring C. Elegans network
-H_CEleg = rewire_multi(G_CEleg,10*len(G_CEleg.nodes()))
+# (the random network is cached, and shared with other normalizations)
+E_CEleg, nodes_CEleg = graph_to_edges(G_CEleg)
+ENull_CEleg = cached_null_ensemble(E_CEleg, len(nodes_CEleg), 1, seed=0,
+                                   nProc=1)
+H_CEleg = edges_to_graph(ENull_CEleg[0], nodes_CEleg)
 
 ##### C. Elegan network degee sequence after re-wiring
 degree_CEleg_rewire = [d for n, d in H_CEleg.degree()]
@@ -7,8 +7,19 @@
 import os
 import numpy as np
 import nibabel as nib
+import sys
+sys.path.append('../../Atlas')
+from fmri_stream import open_fmri, iter_fmri_chunks, write_fmri_chunks
 
-def regress_global(ffmri, fmask, fMoPar, fPhysPar, colInd, fout):
+def regress_global(ffmri, fmask, fMoPar, fPhysPar, colInd, fout, chunkMB=256):
+    '''
+    regresses out the motion parameters and the mean time courses in
+    columns colInd of the PhysPar file from the within-mask voxels of
+    ffmri, then writes the residuals to fout. The fMRI data are streamed
+    in chunks of time points (at most chunkMB megabytes at a time), twice:
+    once to estimate the regression coefficients, once to write out the
+    residuals. The output image is written as float32.
+    '''
 
     # reading motion parameters
     MoPar = np.genfromtxt(fMoPar,
@@ -21,32 +32,24 @@ def regress_global(ffmri, fmask, fMoPar, fPhysPar, colInd, fout):
     # concatenating parameters and centering
     M = np.hstack((MoPar, PhysPar))
     cM = M - np.ones([NScan, 1])*(np.sum(M, axis=0)/NScan)
-    # loading the image data
-    img_data = nib.load(ffmri)
-    X_data = img_data.get_data()
-    img_mask = nib.load(fmask)
-    X_mask = img_mask.get_data()    
-    # then creating a data matrix of elements within-mask elements
-    # the dimension of the matrix is T x V, where T is tne number of schans
-    # and V is the number of within-mask voxels
+    # the image data -- header only, the voxel data are streamed
+    img_data = open_fmri(ffmri)
+    X_mask = np.asarray(nib.load(fmask).dataobj)
+    # the data matrix Y of within-mask elements is T x V, where T is the
+    # number of scans and V is the number of within-mask voxels. Beta is
+    # accumulated over chunks of scans, without building Y.
     indMaskV = np.nonzero(X_mask)
-    for iTime in range(NScan):
-        tmpX_data = X_data[:,:,:,iTime]
-        tmptrX_data = tmpX_data[indMaskV]
-        if iTime==0:
-            Y = np.array(tmptrX_data)
-        else:
-            Y = np.vstack((Y, tmptrX_data))
-    # regressing out the motion and mean signals
-    Beta = np.dot(np.linalg.pinv(cM), Y)
-    eY = Y - np.dot(cM, Beta)
-    # putting back the calculation results to a 4D matrix
-    outY = np.zeros_like(X_data)
-    for iTime in range(NScan):
-        tmpY = np.zeros_like(X_mask)
-        tmpY[indMaskV] = eY[iTime, :]
-        outY[:,:,:,iTime] = tmpY
+    pinvM = np.linalg.pinv(cM)
+    Beta = np.zeros((cM.shape[1], len(indMaskV[0])))
+    for tStart, tEnd, X_data in iter_fmri_chunks(img_data, chunkMB):
+        Y = X_data[indMaskV].T
+        Beta += np.dot(pinvM[:,tStart:tEnd], Y)
+    # regressing out the motion and mean signals, chunk by chunk, and
     # writing out the result image
-    regimg = nib.Nifti1Image(outY, img_data.get_affine())
-    nib.save(regimg, fout)
-
+    def residual_chunks():
+        for tStart, tEnd, X_data in iter_fmri_chunks(img_data, chunkMB):
+            eY = X_data[indMaskV].T - np.dot(cM[tStart:tEnd,:], Beta)
+            outY = np.zeros(X_data.shape, dtype=np.float32)
+            outY[indMaskV] = eY.T
+            yield outY
+    write_fmri_chunks(fout, img_data.header, residual_chunks())